@@ -0,0 +1,108 @@
+"""
+Shared pieces of the REST API: cursor pagination and conditional GET.
+
+Every list is paginated with an opaque cursor on a stable ``(date, id)``
+ordering, so a page costs one index seek whatever its depth and pages do
+not shift when rows are added. GET responses carry an ETag (hash of the
+body) and, for append-only resources, a Last-Modified date; a client
+sending them back gets a 304 without the body.
+"""
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from sales.pagination import paginate_keyset
+
+
+class ApiCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
+
+
+class DateCursorPagination(ApiCursorPagination):
+    ordering = ('-date', '-id')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest first on ``keys`` with ``?after=`` / ``?before=`` cursors
+    (``sales.pagination.paginate_keyset``).
+
+    ``CursorPagination`` seeks on its first ordering field only and skips
+    the rows sharing it with an offset: use this one when that field has
+    many ties, like a date.
+    """
+    page_size = ApiCursorPagination.page_size
+    page_size_query_param = ApiCursorPagination.page_size_query_param
+    max_page_size = ApiCursorPagination.max_page_size
+    keys = ('date', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = paginate_keyset(
+            queryset, after=request.query_params.get('after'), before=request.query_params.get('before'),
+            per_page=self.get_page_size(request), keys=self.keys,
+        )
+        return list(self.page)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def _link(self, param, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'after')
+        return replace_query_param(remove_query_param(url, 'before'), param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link('after', self.page.next_cursor),
+            'previous': self._link('before', self.page.previous_cursor),
+            'results': data,
+        })
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators on successful GET responses of a viewset.
+
+    ``last_modified_field`` names a datetime that changes with every row
+    that can appear in a response (only true for append-only data).
+    """
+    last_modified_field = None
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self._track_modified(page)
+        return page
+
+    def get_object(self):
+        obj = super().get_object()
+        self._track_modified([obj])
+        return obj
+
+    def _track_modified(self, objects):
+        if self.last_modified_field and objects:
+            self._last_modified = max(getattr(obj, self.last_modified_field) for obj in objects)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.has_header('ETag'):
+            return response
+        response.render()
+        response['ETag'] = quote_etag(hashlib.md5(response.content, usedforsecurity=False).hexdigest())
+        last_modified = getattr(self, '_last_modified', None)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+            last_modified = int(last_modified.timestamp())
+        response.setdefault('Cache-Control', 'private, no-cache')
+        return get_conditional_response(request, etag=response['ETag'], last_modified=last_modified, response=response)
@@ -0,0 +1,121 @@
+"""
+Per-view query instrumentation.
+
+``QueryCountMiddleware`` (opt-in, ``QUERY_INSTRUMENTATION = True``) records
+for each request the number of queries, the time spent in the database,
+the queries repeated with different parameters (N+1 fingerprints) and the
+total time. Figures are sent back as response headers, aggregated per URL
+name in this process (``/debug/queries/``) and checked against
+``QUERY_BUDGETS``: over budget is logged, or raised with
+``QUERY_BUDGET_STRICT`` (tests).
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Repeated fingerprints kept per view in the aggregated stats.
+TOP_DUPLICATES = 10
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_SPACES = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """SQL with its parameter lists collapsed: equal for the queries of an N+1 loop."""
+    return _SPACES.sub(' ', _IN_LIST.sub('IN (...)', sql)).strip()
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` collecting the queries of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        """[(fingerprint, count)] of the queries run more than once, most repeated first."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > 1]
+
+
+def budget_for(view_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def record(view_name, recorder, total):
+    """Add one request to the per-view aggregates and enforce its budget."""
+    duplicates = recorder.duplicates()
+    with _lock:
+        entry = _stats.setdefault(view_name, {
+            'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0,
+            'total_time': 0.0, 'over_budget': 0, 'duplicates': Counter(),
+        })
+        entry['requests'] += 1
+        entry['queries'] += recorder.count
+        entry['max_queries'] = max(entry['max_queries'], recorder.count)
+        entry['db_time'] += recorder.duration
+        entry['total_time'] += total
+        for sql, n in duplicates:
+            entry['duplicates'][sql] = max(entry['duplicates'][sql], n)
+        if len(entry['duplicates']) > 10 * TOP_DUPLICATES:
+            entry['duplicates'] = Counter(dict(entry['duplicates'].most_common(TOP_DUPLICATES)))
+
+    budget = budget_for(view_name)
+    if budget is None or recorder.count <= budget:
+        return
+    with _lock:
+        entry['over_budget'] += 1
+    message = f'{view_name}: {recorder.count} queries (budget {budget})'
+    if duplicates:
+        sql, n = duplicates[0]
+        message += f', {n}x {sql[:200]}'
+    if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def stats():
+    """Snapshot of the per-view aggregates, heaviest views first."""
+    with _lock:
+        rows = [
+            {
+                'view': name,
+                'requests': e['requests'],
+                'avg_queries': round(e['queries'] / e['requests'], 1),
+                'max_queries': e['max_queries'],
+                'budget': budget_for(name),
+                'over_budget': e['over_budget'],
+                'avg_db_ms': round(e['db_time'] * 1000 / e['requests'], 2),
+                'avg_total_ms': round(e['total_time'] * 1000 / e['requests'], 2),
+                'duplicates': e['duplicates'].most_common(TOP_DUPLICATES),
+            }
+            for name, e in _stats.items()
+        ]
+    return sorted(rows, key=lambda row: row['avg_queries'], reverse=True)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,229 @@
+import json
+import random
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from django import get_version
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from core.models import Shop
+from inventory.models import Product
+from sales.models import Invoice
+from sales.pagination import paginate_keyset
+from sales.rollups import stats_cache_key
+from .seed_data import DEMO_USERNAME_PREFIX
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[rank - 1]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot paths (POS sale, api_sync bursts, product search, "
+        "statistics, deep invoice pages, PDF export) against an existing shop, "
+        "e.g. one created by `manage.py seed_data`. Reports latency percentiles "
+        "and query counts and saves them as JSON; --compare shows the changes "
+        "against a previous run. Sales are really recorded in the shop, so "
+        "only shops created by seed_data are accepted unless --yes is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help="Shop id (default: the seeded shop with the most sales).")
+        parser.add_argument('--yes', action='store_true', help="Accept a shop not created by seed_data.")
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO', help="Run only these scenarios.")
+        parser.add_argument('--burst', type=int, default=20, help="Operations per api_sync request.")
+        parser.add_argument('--depth', type=int, default=50, help="Invoice list page to fetch.")
+        parser.add_argument('--output', help="JSON file (default: <temp dir>/benchmarks/<date>-<revision>.json).")
+        parser.add_argument('--compare', help="Previous JSON result to compare with.")
+        parser.add_argument('--tolerance', type=float, default=20.0, help="Slowdown (%%) reported as a regression.")
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['shop']:
+            shop = Shop.objects.select_related('owner').filter(pk=options['shop']).first()
+        else:
+            shop = (
+                Shop.objects.select_related('owner').filter(owner__username__startswith=DEMO_USERNAME_PREFIX)
+                .annotate(n=Count('sales')).order_by('-n').first()
+            )
+        if shop is None:
+            raise CommandError("Aucune boutique: lancez d'abord `manage.py seed_data`.")
+        if not shop.owner.username.startswith(DEMO_USERNAME_PREFIX) and not options['yes']:
+            raise CommandError(
+                f"La boutique #{shop.pk} n'a pas été créée par seed_data et le benchmark y enregistre "
+                "des ventes. Ajoutez --yes pour confirmer."
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.shop = shop
+        self.options = options
+        self.products = list(Product.objects.filter(shop=shop, quantity__gt=0).values('id', 'name', 'selling_price'))
+        if not self.products:
+            raise CommandError(f"La boutique #{shop.pk} n'a aucun produit en stock.")
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.client.force_login(shop.owner)
+
+        # Name -> setup returning the scenario, so only the selected ones are prepared.
+        scenarios = {
+            'pos_sale': lambda: self.pos_sale,
+            'api_sync_burst': lambda: self.api_sync_burst,
+            'search_products': lambda: self.search_products,
+            'statistics': lambda: self.statistics,
+            'invoice_list_deep': self.invoice_list_deep,
+            'export_accounting_pdf': lambda: self.export_accounting_pdf,
+        }
+        unknown = set(options['only'] or ()) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Scénarios inconnus: {', '.join(sorted(unknown))}. Disponibles: {', '.join(scenarios)}")
+
+        results = {}
+        for name, setup in scenarios.items():
+            if options['only'] and name not in options['only']:
+                continue
+            results[name] = self._measure(setup(), options['iterations'], options['warmup'])
+            self._report(name, results[name])
+
+        payload = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'django': get_version(),
+            'database': connection.vendor,
+            'shop': {
+                'id': shop.pk,
+                'products': shop.products.count(),
+                'sales': shop.sales.count(),
+            },
+            'iterations': options['iterations'],
+            'results': results,
+        }
+        if options['output']:
+            path = Path(options['output'])
+        else:
+            path = Path(tempfile.gettempdir()) / 'benchmarks' / f"{datetime.now():%Y%m%d-%H%M%S}-{payload['revision'] or 'local'}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, indent=2))
+        self.stdout.write(f"Résultats enregistrés dans {path}")
+
+        if options['compare']:
+            self._compare(json.loads(Path(options['compare']).read_text())['results'], results, options['tolerance'])
+
+    def _measure(self, scenario, iterations, warmup):
+        for _ in range(warmup):
+            scenario()
+        timings, queries, errors = [], [], 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = scenario()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured.captured_queries))
+            if response.status_code >= 400:
+                errors += 1
+        result = {f'p{p}_ms': round(percentile(timings, p), 2) for p in PERCENTILES}
+        result.update({
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': round(sum(queries) / len(queries), 1),
+            'max_queries': max(queries),
+            'errors': errors,
+        })
+        return result
+
+    def _report(self, name, result):
+        line = (
+            f"{name:<24} p50 {result['p50_ms']:>8.1f} ms  p90 {result['p90_ms']:>8.1f} ms  "
+            f"p99 {result['p99_ms']:>8.1f} ms  {result['queries']:>6.1f} requêtes"
+        )
+        if result['errors']:
+            line += f"  {result['errors']} erreur(s)"
+            self.stdout.write(self.style.ERROR(line))
+        else:
+            self.stdout.write(line)
+
+    def _compare(self, previous, results, tolerance):
+        self.stdout.write("Comparaison avec le run précédent:")
+        for name, result in results.items():
+            before = previous.get(name)
+            if not before:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) * 100 / before['p50_ms'] if before['p50_ms'] else 0
+            line = (
+                f"{name:<24} p50 {before['p50_ms']:.1f} -> {result['p50_ms']:.1f} ms ({change:+.0f}%)  "
+                f"requêtes {before['queries']} -> {result['queries']}"
+            )
+            if change > tolerance or result['queries'] > before['queries']:
+                self.stdout.write(self.style.WARNING(line + "  RÉGRESSION"))
+            else:
+                self.stdout.write(line)
+
+    # Scenarios: each performs one request and returns the response.
+
+    def _basket(self, size):
+        return [
+            {'product': p['id'], 'quantity': 1, 'price': str(p['selling_price'])}
+            for p in self.rng.sample(self.products, min(size, len(self.products)))
+        ]
+
+    def pos_sale(self):
+        return self.client.post(
+            '/api/sales/', json.dumps({'items': self._basket(self.rng.randint(1, 4))}),
+            content_type='application/json',
+        )
+
+    def api_sync_burst(self):
+        operations = [
+            {'type': 'sale', 'op_id': str(uuid.uuid4()), 'payload': {'items': self._basket(self.rng.randint(1, 3))}}
+            for _ in range(self.options['burst'])
+        ]
+        return self.client.post('/api/sync/', json.dumps({'operations': operations}), content_type='application/json')
+
+    def search_products(self):
+        name = self.rng.choice(self.products)['name']
+        return self.client.get('/sales/products/search/', {'q': name[:self.rng.randint(3, 6)]})
+
+    def statistics(self):
+        # Measure the computation, not the per-shop cache.
+        cache.delete(stats_cache_key(self.shop.pk))
+        return self.client.get('/finance/statistics/')
+
+    def invoice_list_deep(self):
+        # Setup: walk to the cursor of page --depth once, then time that page only.
+        invoices = Invoice.objects.filter(sale__shop=self.shop)
+        cursor = None
+        for _ in range(self.options['depth'] - 1):
+            page = paginate_keyset(invoices, after=cursor, per_page=20, keys=('sale__created_at', 'sale_id'))
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        params = {'after': cursor} if cursor else {}
+        return lambda: self.client.get('/sales/invoices/', params)
+
+    def export_accounting_pdf(self):
+        return self.client.get('/finance/export/pdf/')
@@ -0,0 +1,199 @@
+import random
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+from core.models import Shop, User
+from finance.models import Customer, Expense, Loan
+from inventory.models import Category, Product, StockMovement
+from inventory.services import InsufficientStock, record_adjustment
+from sales import rollups
+from sales.models import Invoice, Sale
+from sales.services import commit_sale
+
+# Owners of seeded shops; manage.py benchmark only writes to those shops.
+DEMO_USERNAME_PREFIX = 'demo-'
+CATEGORIES = ['Boissons', 'Alimentation', 'Hygiène', 'Entretien', 'Papeterie', 'Électronique']
+WORDS = ['Savon', 'Riz', 'Huile', 'Sucre', 'Lait', 'Café', 'Biscuit', 'Jus', 'Eau', 'Sardine',
+         'Pâtes', 'Farine', 'Sel', 'Bougie', 'Cahier', 'Stylo', 'Pile', 'Ampoule', 'Dentifrice', 'Lessive']
+EXPENSE_CATEGORIES = [('Loyer', 1), ('Électricité', 2), ('Transport', 6), ('Salaires', 1), ('Fournitures', 4)]
+PAYMENT_WEIGHTS = [(Sale.PaymentMethod.CASH, 60), (Sale.PaymentMethod.MOBILE_MONEY, 30),
+                   (Sale.PaymentMethod.CARD, 5), (Sale.PaymentMethod.BANK_TRANSFER, 5)]
+# Relative activity by weekday (Monday first).
+WEEKDAY_FACTORS = [0.9, 0.9, 1.0, 1.0, 1.2, 1.5, 0.5]
+
+
+def _price(value):
+    """Round to 25 FCFA like shelf prices."""
+    return Decimal(max(25, int(round(value / 25)) * 25))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic shops for benchmarks and demos: "
+        "N shops x M products x K sales spread over the last days, with "
+        "their items, movements, invoices, loans and expenses. Sales go "
+        "through sales.services.commit_sale, then their dates are moved "
+        "back and the daily rollups rebuilt, so rollups, valuations and the "
+        "ledger are consistent. Audit log entries keep the real time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=3)
+        parser.add_argument('--products', type=int, default=200, help="Products per shop.")
+        parser.add_argument('--sales', type=int, default=2000, help="Sales per shop.")
+        parser.add_argument('--days', type=int, default=90, help="History length, up to yesterday.")
+        parser.add_argument('--loans', type=int, default=30, help="Loans and debts per shop.")
+        parser.add_argument('--expenses', type=int, default=60, help="Expenses per shop.")
+        parser.add_argument('--plan', default=Shop.Plan.PRO, choices=Shop.Plan.values)
+        parser.add_argument('--password', default='demo1234')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        tag = uuid.uuid4().hex[:6]
+        for n in range(options['shops']):
+            shop = self._seed_shop(rng, f'{tag}{n}', options)
+            self.stdout.write(
+                f"{shop.name} (#{shop.pk}): {shop.products.count()} produits, {shop.sales.count()} ventes, "
+                f"connexion: {shop.owner.username} / {options['password']}"
+            )
+        self.stdout.write(self.style.SUCCESS("Données de démonstration créées."))
+
+    @staticmethod
+    def _backdate(queryset, field, dates, key='pk'):
+        """Set ``field`` to dates[value of ``key``] (auto_now_add ignores given values)."""
+        if dates:
+            queryset.filter(**{f'{key}__in': dates}).update(**{field: Case(
+                *[When(**{key: k}, then=Value(at)) for k, at in dates.items()], output_field=DateTimeField(),
+            )})
+
+    def _seed_shop(self, rng, tag, options):
+        days = options['days']
+        start = timezone.localdate() - timedelta(days=days)
+        opening = timezone.make_aware(datetime.combine(start, time(8)))
+
+        with transaction.atomic():
+            owner = User.objects.create_user(
+                username=f'{DEMO_USERNAME_PREFIX}{tag}', password=options['password'], role=User.Role.ADMIN
+            )
+            shop = Shop.objects.create(name=f'Boutique Démo {tag}', owner=owner, plan=options['plan'])
+            owner.shop = shop
+            owner.save(update_fields=['shop'])
+            cashiers = [owner] + [
+                User.objects.create_user(
+                    username=f'{DEMO_USERNAME_PREFIX}{tag}-caisse{i}', password=options['password'], role=User.Role.CASHIER, shop=shop
+                )
+                for i in range(rng.randint(1, 3))
+            ]
+            categories = [Category.objects.create(shop=shop, name=name) for name in CATEGORIES]
+            products = []
+            for i in range(options['products']):
+                cost = _price(rng.lognormvariate(6.5, 1.0))
+                product = Product.objects.create(
+                    shop=shop,
+                    category=rng.choice(categories),
+                    name=f'{rng.choice(WORDS)} {rng.choice(WORDS).lower()} {i + 1}',
+                    barcode=f'{rng.randrange(10 ** 12):012d}{i % 10}',
+                    purchase_price=cost,
+                    selling_price=_price(float(cost) * rng.uniform(1.15, 1.6)),
+                    quantity=rng.randint(20, 200),
+                    alert_threshold=rng.choice([3, 5, 10]),
+                )
+                record_adjustment(product, product.quantity, 'Stock initial')
+                products.append(product)
+            Shop.objects.filter(pk=shop.pk).update(created_at=opening)
+            Product.objects.filter(shop=shop).update(created_at=opening)
+            StockMovement.objects.filter(shop=shop).update(date=opening)
+
+        # Popularity follows a Zipf law: a few products make most of the sales.
+        popularity = [1 / (rank + 1) ** 1.1 for rank in range(len(products))]
+        rng.shuffle(popularity)
+        day_weights = [WEEKDAY_FACTORS[(start + timedelta(days=d)).weekday()] for d in range(days)]
+        per_day = [0] * days
+        for d in rng.choices(range(days), weights=day_weights, k=options['sales']):
+            per_day[d] += 1
+
+        for d, count in enumerate(per_day):
+            day = start + timedelta(days=d)
+            # Opening hours 8h-21h with a lunch and an evening peak.
+            moments = sorted(
+                rng.triangular(8, 21, rng.choice([12.5, 18])) for _ in range(count)
+            )
+            sales, restocks = {}, {}
+            with transaction.atomic():
+                for hour in moments:
+                    at = timezone.make_aware(datetime.combine(day, time(int(hour), int(hour % 1 * 60), rng.randrange(60))))
+                    sale = self._sell(rng, shop, cashiers, products, popularity, restocks, at)
+                    if sale is not None:
+                        sales[sale.pk] = at
+                self._backdate(Sale.objects.filter(shop=shop), 'created_at', sales)
+                self._backdate(Invoice.objects.filter(sale__shop=shop), 'created_at', sales, key='sale_id')
+                self._backdate(
+                    StockMovement.objects.filter(shop=shop), 'date',
+                    {f'Vente #{pk}': at for pk, at in sales.items()}, key='reason',
+                )
+                self._backdate(StockMovement.objects.filter(shop=shop), 'date', restocks)
+
+        self._seed_finance(rng, shop, owner, start, days, options)
+        # Sales were rolled up on the day they were written.
+        rollups.rebuild(shop)
+        return shop
+
+    def _sell(self, rng, shop, cashiers, products, popularity, restocks, at):
+        size = min(1 + int(rng.expovariate(0.8)), 6)
+        basket = {p.pk: p for p in rng.choices(products, weights=popularity, k=size)}
+        items = [
+            {'product': pk, 'quantity': rng.choices([1, 2, 3, 4, 5], weights=[70, 18, 7, 3, 2])[0]}
+            for pk in basket
+        ]
+        payment = rng.choices([m for m, _w in PAYMENT_WEIGHTS], weights=[w for _m, w in PAYMENT_WEIGHTS])[0]
+        for _attempt in range(2):
+            try:
+                return commit_sale(shop, rng.choice(cashiers), items, payment_method=payment)
+            except InsufficientStock as e:
+                # Restock what ran out, as the shop would, and sell again.
+                for failure in e.failures:
+                    product = basket[failure['product']]
+                    delta = rng.randint(50, 150)
+                    Product.objects.filter(pk=product.pk).update(quantity=F('quantity') + delta)
+                    restocks[record_adjustment(product, delta, 'Réapprovisionnement').pk] = at
+
+    def _seed_finance(self, rng, shop, owner, start, days, options):
+        customers = Customer.objects.bulk_create([
+            Customer(shop=shop, name=f'Client {i + 1}', phone=f'6{rng.randrange(10 ** 8):08d}')
+            for i in range(max(1, options['loans'] // 2))
+        ])
+        loans = []
+        for _ in range(options['loans']):
+            amount = _price(rng.lognormvariate(10, 0.8))
+            paid = rng.choice([Decimal(0), amount, _price(float(amount) * rng.random())])
+            paid = min(paid, amount)
+            status = Loan.Status.PAID if paid == amount else Loan.Status.PARTIAL if paid else Loan.Status.PENDING
+            loans.append(Loan(
+                shop=shop, customer=rng.choice(customers),
+                loan_type=rng.choices([Loan.LoanType.LOAN, Loan.LoanType.DEBT], weights=[3, 1])[0],
+                amount=amount, amount_paid=paid, status=status,
+                due_date=start + timedelta(days=rng.randint(7, days + 30)),
+            ))
+        Loan.objects.bulk_create(loans)
+        opening = timezone.make_aware(datetime.combine(start, time(8)))
+        Customer.objects.filter(shop=shop).update(created_at=opening)
+        self._backdate(Loan.objects.filter(shop=shop), 'created_at', {
+            loan.pk: opening + timedelta(days=rng.randrange(days), hours=rng.randint(0, 12))
+            for loan in loans
+        })
+
+        names, weights = zip(*EXPENSE_CATEGORIES)
+        Expense.objects.bulk_create([
+            Expense(
+                shop=shop, created_by=owner, category=category,
+                amount=_price(rng.lognormvariate(9.5 if category in ('Loyer', 'Salaires') else 8, 0.5)),
+                description=f'{category} (démo)',
+                date=start + timedelta(days=rng.randrange(days)),
+            )
+            for category in rng.choices(names, weights=weights, k=options['expenses'])
+        ])
@@ -0,0 +1,77 @@
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+from . import instrumentation
+from .models import Shop, User
+
+# view_name under which requests matching no URL pattern are recorded.
+UNRESOLVED = '<unresolved>'
+
+
+def get_shop(user):
+    """Current shop of ``user`` (owner joined), or None. Reuses ``user.shop`` once loaded."""
+    if not user.is_authenticated or not user.shop_id:
+        return None
+    if User.shop.is_cached(user):
+        return user.shop
+    user.shop = Shop.objects.select_related('owner').filter(pk=user.shop_id).first()
+    return user.shop
+
+
+class ShopMiddleware:
+    """
+    Expose the user's shop as ``request.shop``.
+
+    Loaded lazily, at most once per request, and shared with
+    ``request.user.shop``. Falsy when the user has no shop.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Resolved on first access so users authenticated later by DRF are seen.
+        request.shop = SimpleLazyObject(lambda: get_shop(request.user))
+        return self.get_response(request)
+
+
+class QueryCountMiddleware:
+    """
+    Count the queries and DB time of each request (see core.instrumentation).
+
+    Opt-in with ``QUERY_INSTRUMENTATION = True``; list it first so the
+    session and authentication queries are counted too.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = instrumentation.QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        # One bucket for 404s: distinct paths (e.g. from scanners) would each
+        # add a permanent entry to the process-wide stats.
+        match = request.resolver_match
+        view_name = match.view_name if match else UNRESOLVED
+        if request.method not in ('GET', 'HEAD'):
+            view_name = f'{request.method} {view_name}'
+        duplicates = sum(n - 1 for _sql, n in recorder.duplicates())
+        response['X-DB-Queries'] = str(recorder.count)
+        response['X-DB-Duplicates'] = str(duplicates)
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f}, '
+            f'app;dur={(total - recorder.duration) * 1000:.1f}'
+        )
+        instrumentation.record(view_name, recorder, total)
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_shop_plan_alter_subscriptionplan_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('op_id', models.CharField(max_length=64)),
+                ('op_type', models.CharField(max_length=20)),
+                ('object_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_operations', to='core.shop')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('shop', 'op_id'), name='unique_sync_operation')],
+            },
+        ),
+    ]
@@ -32,6 +32,9 @@ class Shop(models.Model):
     address = models.TextField(blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
 
+    # Bumped on every product change, see inventory.catalog
+    catalog_version = models.PositiveBigIntegerField(default=0)
+
     def __str__(self):
         return self.name
 
@@ -72,3 +75,23 @@ class SubscriptionPlan(models.Model):
     @property
     def features_list(self):
         return [f.strip() for f in self.features.split('\n') if f.strip()]
+
+class SyncOperation(models.Model):
+    """
+    Registre des opérations hors-ligne déjà appliquées par /api/sync/.
+    The PWA tags each queued operation with a client-generated ``op_id``;
+    replaying an operation found here is a no-op.
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='sync_operations')
+    op_id = models.CharField(max_length=64)
+    op_type = models.CharField(max_length=20)
+    object_id = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'op_id'], name='unique_sync_operation'),
+        ]
+
+    def __str__(self):
+        return f"{self.op_type} {self.op_id}"
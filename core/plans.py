@@ -0,0 +1,67 @@
+"""
+Subscription plans and plan gates.
+
+``SubscriptionPlan`` rows only change from the admin, so every process keeps
+them in memory: the process that saves or deletes a plan drops its copy
+through ``core.signals``, the others reload after ``PLANS_CACHE_TIMEOUT``
+seconds. What each plan unlocks is defined on ``Shop`` (``is_pro``,
+``has_advanced_accounting``...) and checked with ``plan_required``.
+"""
+import threading
+import time
+from functools import wraps
+from django.conf import settings
+from django.shortcuts import render
+from .models import SubscriptionPlan
+
+PLANS_CACHE_TIMEOUT = getattr(settings, 'PLANS_CACHE_TIMEOUT', 300)
+
+_lock = threading.Lock()
+_plans = None
+_loaded_at = 0.0
+_generation = 0
+
+
+def get_plans():
+    """All plans ordered by price. Shared instances: do not modify them."""
+    global _plans, _loaded_at
+    plans = _plans
+    if plans is not None and time.monotonic() - _loaded_at < PLANS_CACHE_TIMEOUT:
+        return plans
+    generation = _generation
+    plans = list(SubscriptionPlan.objects.order_by('price'))
+    with _lock:
+        # Don't store a list read before a concurrent invalidation.
+        if generation == _generation:
+            _plans, _loaded_at = plans, time.monotonic()
+    return plans
+
+
+def get_plan(pk=None, code=None):
+    """Cached plan by id or by code (``Shop.Plan``), or None."""
+    for plan in get_plans():
+        if (pk is not None and plan.pk == pk) or (code is not None and plan.code == code):
+            return plan
+    return None
+
+
+def invalidate_plans():
+    global _plans, _generation
+    with _lock:
+        _plans = None
+        _generation += 1
+
+
+def plan_required(feature, template='finance/upgrade.html'):
+    """
+    Show the upgrade page unless ``request.shop`` has ``feature``, the name of
+    a ``Shop`` entitlement property such as ``'is_pro'``.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(request.shop, feature, False):
+                return render(request, template)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
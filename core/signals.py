@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import SubscriptionPlan
+from .plans import invalidate_plans
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def drop_plans_cache(sender, **kwargs):
+    invalidate_plans()
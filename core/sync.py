@@ -0,0 +1,125 @@
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from inventory.services import InsufficientStock
+from sales.models import Sale
+from sales.services import commit_sale, resolve_products
+from .models import SyncOperation
+
+# Number of operations committed per transaction.
+SYNC_CHUNK_SIZE = getattr(settings, 'SYNC_CHUNK_SIZE', 50)
+
+
+def _op_id(op):
+    op_id = op.get('op_id') or op.get('id')
+    return str(op_id)[:64] if op_id else None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sale_items(payload):
+    """Normalize the items of an offline sale payload."""
+    items = []
+    for it in payload.get('items') or []:
+        price = it.get('price')
+        if price is not None:
+            try:
+                price = Decimal(str(price))
+            except InvalidOperation:
+                raise ValueError(f"Prix invalide: {price}")
+        product = it.get('product')
+        product_id = _to_int(product)
+        if product and product_id is None:
+            raise ValueError(f"Produit {product} introuvable ou hors shop.")
+        items.append({
+            'product': product_id,
+            'product_name': it.get('product_name'),
+            'quantity': _to_int(it.get('quantity')) or 0,
+            'price': price,
+        })
+    return items
+
+
+def _apply_sale(shop, user, payload, products):
+    sale_fields = {}
+    if payload.get('payment_method') in Sale.PaymentMethod.values:
+        sale_fields['payment_method'] = payload['payment_method']
+    return commit_sale(shop, user, _sale_items(payload), products=products, **sale_fields)
+
+
+def apply_operations(user, ops, chunk_size=SYNC_CHUNK_SIZE):
+    """Replay a batch of offline operations and return one ack per operation.
+
+    Every product referenced by the batch is loaded in a single query and
+    operations are committed ``chunk_size`` at a time, each inside its own
+    savepoint so a failing sale does not roll back its neighbours. Operations
+    carrying an ``op_id`` already recorded in ``SyncOperation`` are skipped.
+    """
+    shop = user.shop
+    acks = []
+
+    op_ids = {_op_id(op) for op in ops if isinstance(op, dict)} - {None}
+    applied = dict(
+        SyncOperation.objects.filter(shop=shop, op_id__in=op_ids).values_list('op_id', 'object_id')
+    ) if op_ids else {}
+
+    product_ids = set()
+    for op in ops:
+        if isinstance(op, dict) and op.get('type') == 'sale':
+            for it in (op.get('payload') or {}).get('items') or []:
+                product_id = _to_int(it.get('product'))
+                if product_id:
+                    product_ids.add(product_id)
+    products = resolve_products(shop, product_ids)
+
+    for start in range(0, len(ops), chunk_size):
+        with transaction.atomic():
+            for op in ops[start:start + chunk_size]:
+                acks.append(_apply_operation(shop, user, op, products, applied))
+    return acks
+
+
+def _apply_operation(shop, user, op, products, applied):
+    if not isinstance(op, dict):
+        return {'op_id': None, 'status': 'error', 'error': 'Invalid operation'}
+
+    op_id = _op_id(op)
+    op_type = op.get('type')
+    ack = {'op_id': op_id, 'type': op_type}
+
+    if op_id and op_id in applied:
+        ack.update(status='duplicate', id=_to_int(applied[op_id]))
+        return ack
+    if op_type != 'sale':
+        ack.update(status='error', error='Unknown op type')
+        return ack
+
+    try:
+        with transaction.atomic():
+            sale = _apply_sale(shop, user, op.get('payload') or {}, products)
+            if op_id:
+                SyncOperation.objects.create(shop=shop, op_id=op_id, op_type=op_type, object_id=str(sale.id))
+    except IntegrityError as e:
+        # Same op_id committed concurrently by another request?
+        done = SyncOperation.objects.filter(shop=shop, op_id=op_id).first() if op_id else None
+        if done is None:
+            ack.update(status='error', error=str(e))
+        else:
+            ack.update(status='duplicate', id=_to_int(done.object_id))
+        return ack
+    except InsufficientStock as e:
+        ack.update(status='error', error=str(e), stock=e.failures)
+        return ack
+    except Exception as e:
+        ack.update(status='error', error=str(e))
+        return ack
+
+    if op_id:
+        applied[op_id] = str(sale.id)
+    ack.update(status='created', id=sale.id)
+    return ack
@@ -0,0 +1,54 @@
+from django.test import TestCase
+from core.models import Shop, SyncOperation, User
+from core.sync import apply_operations
+from inventory.models import Product
+from sales.models import Sale
+
+
+class SyncReplayTest(TestCase):
+    """Offline operations replayed through ``apply_operations``."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='sync', password='sync')
+        self.shop = Shop.objects.create(name='Sync', owner=self.owner)
+        self.owner.shop = self.shop
+        self.owner.save()
+        self.product = Product.objects.create(shop=self.shop, name='Sync', selling_price=100, quantity=10)
+
+    def _sale(self, op_id, quantity=1):
+        return {'type': 'sale', 'op_id': op_id, 'payload': {'items': [{'product': self.product.pk, 'quantity': quantity}]}}
+
+    def _stock(self):
+        return Product.objects.values_list('quantity', flat=True).get(pk=self.product.pk)
+
+    def test_replayed_op_id_is_applied_once(self):
+        first = apply_operations(self.owner, [self._sale('a')])
+        again = apply_operations(self.owner, [self._sale('a'), self._sale('b'), self._sale('b')])
+
+        self.assertEqual(first[0]['status'], 'created')
+        self.assertEqual([ack['status'] for ack in again], ['duplicate', 'created', 'duplicate'])
+        self.assertEqual(again[0]['id'], first[0]['id'])
+        self.assertEqual(again[2]['id'], again[1]['id'])
+        self.assertEqual(Sale.objects.filter(shop=self.shop).count(), 2)
+        self.assertEqual(SyncOperation.objects.filter(shop=self.shop).count(), 2)
+        self.assertEqual(self._stock(), 8)
+
+    def test_failing_operation_rolls_back_alone(self):
+        ops = [self._sale('ok-1', 3), self._sale('short', 50), {'type': 'refund', 'op_id': 'x'}, self._sale('ok-2', 2)]
+        acks = apply_operations(self.owner, ops, chunk_size=2)
+
+        self.assertEqual([ack['status'] for ack in acks], ['created', 'error', 'error', 'created'])
+        self.assertEqual(acks[1]['stock'][0]['available'], 7)
+        self.assertEqual(self._stock(), 5)
+        self.assertEqual(Sale.objects.filter(shop=self.shop).count(), 2)
+        self.assertFalse(SyncOperation.objects.filter(shop=self.shop, op_id__in=['short', 'x']).exists())
+
+        # Not recorded, so the client can retry it once stock is back.
+        Product.objects.filter(pk=self.product.pk).update(quantity=60)
+        self.assertEqual(apply_operations(self.owner, [self._sale('short', 50)])[0]['status'], 'created')
+
+    def test_invalid_entries_do_not_stop_the_batch(self):
+        acks = apply_operations(self.owner, ['garbage', self._sale(None), {'type': 'sale', 'payload': {'items': []}}])
+
+        self.assertEqual([ack['status'] for ack in acks], ['error', 'created', 'error'])
+        self.assertFalse(SyncOperation.objects.filter(shop=self.shop).exists())
@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views, views_users, views_shop, views_plans, views_public
+from . import views, views_users, views_shop, views_plans, views_public, views_debug
 
 urlpatterns = [
     path('login/', views.login_view, name='login'),
@@ -27,4 +27,7 @@ urlpatterns = [
     path('plans/<int:plan_id>/subscribe/', views_plans.plan_subscribe, name='plan_subscribe'),
     # API sync endpoint for PWA offline queue
     path('api/sync/', views.api_sync, name='api_sync'),
+
+    # Query instrumentation (QUERY_INSTRUMENTATION)
+    path('debug/queries/', views_debug.query_stats, name='query_stats'),
 ]
@@ -1,6 +1,7 @@
 from rest_framework import viewsets
 from .models import User, Shop
 from .serializers import UserSerializer, ShopSerializer
+from .api import ApiCursorPagination, ConditionalGetMixin
 from rest_framework.permissions import IsAuthenticated
 
 # Web Views
@@ -12,11 +13,15 @@ from sales.models import Sale
 import json
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.db import transaction
+from .sync import apply_operations
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserPagination(ApiCursorPagination):
+    ordering = ('-date_joined', '-id')
+
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = UserPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -28,7 +33,7 @@ class UserViewSet(viewsets.ModelViewSet):
             return User.objects.filter(shop=user.shop) # Keeping original model for UserViewSet
         return User.objects.filter(id=user.id) # Keeping original logic for UserViewSet
 
-class ShopViewSet(viewsets.ModelViewSet):
+class ShopViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Shop.objects.all()
     serializer_class = ShopSerializer
     
@@ -53,7 +58,7 @@ def dashboard(request):
     today_sales = Sale.objects.filter(shop=shop, created_at__date=today).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
     
     # Recent sales
-    recent_sales = Sale.objects.filter(shop=shop).order_by('-created_at')[:5]
+    recent_sales = Sale.objects.filter(shop=shop).select_related('cashier').order_by('-created_at')[:5]
 
     context = {
         'shop': shop,
@@ -131,7 +136,8 @@ def onboarding(request):
 @require_POST
 def api_sync(request):
     """Endpoint pour recevoir une liste d'opérations (ex: ventes) envoyées depuis la PWA.
-    Attends JSON: { "operations": [ {"type":"sale", "payload": {...} }, ... ] }
+    Attends JSON: { "operations": [ {"type":"sale", "op_id": "<uuid>", "payload": {...} }, ... ] }
+    Répond avec un accusé par opération (created / duplicate / error), voir core.sync.
     """
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'Not authenticated'}, status=403)
@@ -145,78 +151,14 @@ def api_sync(request):
     if not isinstance(ops, list):
         return JsonResponse({'error': 'operations must be a list'}, status=400)
 
-    results = []
-    errors = []
-
-    from sales.models import SaleItem
-    from inventory.models import Product, StockMovement
-
-    for op in ops:
-        try:
-            if op.get('type') == 'sale':
-                payload = op.get('payload') or {}
-                shop = request.user.shop
-                if not shop:
-                    errors.append({'op': op, 'error': 'User has no shop'})
-                    continue
-
-                with transaction.atomic():
-                    sale = Sale.objects.create(shop=shop, cashier=request.user)
-                    total = 0
-                    items = payload.get('items', [])
-                    if not items:
-                        raise ValueError('Aucun article dans la vente.')
-
-                    for it in items:
-                        product_id = it.get('product')
-                        quantity = int(it.get('quantity', 0))
-                        price = it.get('price')
-                        product = None
-                        product_name = it.get('product_name')
-
-                        if product_id:
-                            product = Product.objects.filter(id=product_id, shop=shop).first()
-                            if not product:
-                                raise ValueError(f"Produit {product_id} introuvable ou hors shop.")
-                            if product.quantity < quantity:
-                                raise ValueError(f"Stock insuffisant pour '{product.name}'.")
-                            if price is None:
-                                price = product.selling_price
-                            product_name = product.name
-
-                        if price is None:
-                            price = 0
-
-                        subtotal = quantity * float(price)
-                        SaleItem.objects.create(
-                            sale=sale,
-                            product=product,
-                            product_name=product_name or 'Vente libre',
-                            quantity=quantity,
-                            price=price,
-                            subtotal=subtotal
-                        )
-                        total += subtotal
-
-                        if product:
-                            StockMovement.objects.create(
-                                product=product,
-                                quantity=quantity,
-                                movement_type=StockMovement.MovementType.OUT,
-                                reason=f"Vente #{sale.id}"
-                            )
-                            product.quantity -= quantity
-                            product.save()
-
-                    sale.total_amount = total
-                    sale.save()
-                    results.append({'type': 'sale', 'id': sale.id})
-            else:
-                errors.append({'op': op, 'error': 'Unknown op type'})
-        except Exception as e:
-            errors.append({'op': op, 'error': str(e)})
-
-    return JsonResponse({'created': results, 'errors': errors})
+    if not request.user.shop:
+        return JsonResponse({'error': 'User has no shop'}, status=400)
+
+    acks = apply_operations(request.user, ops)
+    results = [{'type': a['type'], 'id': a['id']} for a in acks if a['status'] == 'created']
+    errors = [{'op': op, 'error': a['error']} for op, a in zip(ops, acks) if a['status'] == 'error']
+
+    return JsonResponse({'acks': acks, 'created': results, 'errors': errors})
 
 def index(request):
     if request.user.is_authenticated:
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, JsonResponse
+from . import instrumentation
+
+@staff_member_required
+def query_stats(request):
+    """Per-view query figures of this process (QUERY_INSTRUMENTATION)."""
+    if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+        raise Http404
+    if request.method == 'POST':
+        instrumentation.reset()
+    return JsonResponse({'views': instrumentation.stats()})
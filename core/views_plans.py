@@ -1,13 +1,16 @@
+from django.http import Http404
 from django.shortcuts import render, redirect
-from .models import SubscriptionPlan
+from .plans import get_plan, get_plans
 import urllib.parse
 
 def plans_view(request):
-    plans = SubscriptionPlan.objects.all().order_by('price')
+    plans = get_plans()
     return render(request, 'core/plans.html', {'plans': plans})
 
 def plan_subscribe(request, plan_id):
-    plan = SubscriptionPlan.objects.get(id=plan_id)
+    plan = get_plan(pk=plan_id)
+    if plan is None:
+        raise Http404
     
     # WhatsApp Logic
     phone = plan.whatsapp_number
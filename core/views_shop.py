@@ -1,9 +1,62 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
 from .models import Shop, User
-from django.db.models import Sum
-from sales.models import Sale
+from .plans import plan_required
+from finance.models import Loan
+from inventory.models import Product
+from sales.models import DailySalesSummary
+
+OWNER_DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'OWNER_DASHBOARD_CACHE_TIMEOUT', 60)
+
+def _owner_cache_key(owner_id):
+    return f'owner-dashboard:{owner_id}:{timezone.localdate().isoformat()}'
+
+
+STAT_KEYS = ['revenue_today', 'count_today', 'revenue_7d', 'count_7d', 'revenue_30d', 'count_30d', 'low_stock', 'receivables']
+
+
+def _owner_stats(owner, today):
+    """Figures of every shop of ``owner``, {shop_id: {...}}, in three grouped queries."""
+    windows = {
+        'today': Q(date=today),
+        '7d': Q(date__gte=today - timedelta(days=6)),
+        '30d': Q(),
+    }
+    aggregates = {}
+    for name, condition in windows.items():
+        aggregates[f'revenue_{name}'] = Sum('revenue', filter=condition, default=0)
+        aggregates[f'count_{name}'] = Sum('sale_count', filter=condition, default=0)
+
+    stats = defaultdict(lambda: dict.fromkeys(STAT_KEYS, 0))
+    sales = (
+        DailySalesSummary.objects.filter(shop__owner=owner, date__gte=today - timedelta(days=29))
+        .values('shop_id').annotate(**aggregates).order_by()
+    )
+    for row in sales:
+        stats[row.pop('shop_id')].update(row)
+
+    low_stock = (
+        Product.objects.filter(shop__owner=owner, quantity__lte=F('alert_threshold'))
+        .values('shop_id').annotate(n=Count('id')).order_by()
+    )
+    for row in low_stock:
+        stats[row['shop_id']]['low_stock'] = row['n']
+
+    receivables = (
+        Loan.objects.filter(shop__owner=owner, loan_type=Loan.LoanType.LOAN).exclude(status=Loan.Status.PAID)
+        .values('shop_id').annotate(total=Sum(F('amount') - F('amount_paid'))).order_by()
+    )
+    for row in receivables:
+        stats[row['shop_id']]['receivables'] = row['total'] or 0
+    return dict(stats)
+
 
 @login_required
 def shop_list(request):
@@ -14,21 +67,31 @@ def shop_list(request):
     if request.user.role != User.Role.ADMIN:
         return redirect('dashboard')
         
-    shops = Shop.objects.filter(owner=request.user)
+    shops = Shop.objects.filter(owner=request.user).order_by('name')
     
-    # Calculate stats for each shop
+    # Figures of all shops at once, cached per owner for a short while
+    key = _owner_cache_key(request.user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = _owner_stats(request.user, timezone.localdate())
+        cache.set(key, stats, OWNER_DASHBOARD_CACHE_TIMEOUT)
+
     shops_data = []
+    totals = dict.fromkeys(STAT_KEYS, 0)
     for s in shops:
-        sales_today = Sale.objects.filter(shop=s).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        shop_stats = stats.get(s.pk) or dict.fromkeys(STAT_KEYS, 0)
+        for name in STAT_KEYS:
+            totals[name] += shop_stats[name]
         shops_data.append({
             'shop': s,
-            'sales_today': sales_today,
-            'is_current': request.user.shop == s
+            'stats': shop_stats,
+            'is_current': request.user.shop_id == s.pk
         })
         
-    return render(request, 'core/shop_list.html', {'shops_data': shops_data})
+    return render(request, 'core/shop_list.html', {'shops_data': shops_data, 'totals': totals})
 
 @login_required
+@plan_required('is_pro')
 def shop_add(request):
     """
     Add a new shop (Enterprise).
@@ -43,10 +106,6 @@ def shop_add(request):
     # User Request: "mettre un onglet pour ajouter entreprise ... ceci en mode pro"
     # This implies if the CURRENT shop is Pro, they can add more?
     # Or if the USER is a "Pro Owner".
-    
-    # Let's enforce: Current shop must be PRO to add another.
-    if not request.user.shop.is_pro:
-         return render(request, 'finance/upgrade.html')
 
     if request.method == 'POST':
         name = request.POST.get('name')
@@ -55,6 +114,7 @@ def shop_add(request):
         # Create new shop with FREE plan by default? Or inherit?
         # Let's make it FREE initially, they can upgrade.
         shop = Shop.objects.create(name=name, owner=request.user, plan=Shop.Plan.FREE, phone=phone)
+        cache.delete(_owner_cache_key(request.user.pk))
         
         messages.success(request, f"Boutique {name} créée avec succès !")
         return redirect('shop_list')
@@ -2,23 +2,19 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import User
+from .plans import plan_required
 
 @login_required
+@plan_required('is_pro')
 def user_list(request):
     shop = request.user.shop
-    if not shop.is_pro:
-        # Redirect or show upgrade page
-        return render(request, 'finance/upgrade.html')
-    
     users = User.objects.filter(shop=shop)
     return render(request, 'core/user_list.html', {'users': users})
 
 @login_required
+@plan_required('is_pro')
 def user_add(request):
     shop = request.user.shop
-    if not shop.is_pro:
-        return render(request, 'finance/upgrade.html')
-
     if request.method == 'POST':
         username = request.POST.get('username')
         phone = request.POST.get('phone')
@@ -43,11 +39,9 @@ def user_add(request):
     return render(request, 'core/user_form.html')
 
 @login_required
+@plan_required('is_pro')
 def user_edit(request, user_id):
     shop = request.user.shop
-    if not shop.is_pro:
-        return render(request, 'finance/upgrade.html')
-
     user = get_object_or_404(User, id=user_id, shop=shop)
     
     if request.method == 'POST':
@@ -69,11 +63,9 @@ def user_edit(request, user_id):
     return render(request, 'core/user_form.html', {'target_user': user})
 
 @login_required
+@plan_required('is_pro')
 def user_delete(request, user_id):
     shop = request.user.shop
-    if not shop.is_pro:
-         return render(request, 'finance/upgrade.html')
-
     user = get_object_or_404(User, id=user_id, shop=shop)
     
     # Prevent deleting yourself
@@ -0,0 +1,143 @@
+"""
+Line-level data exports.
+
+Each dataset is a ``values_list`` query read with ``.iterator()`` in chunks
+and encoded row by row into a streaming response (CSV, or gzip-compressed
+JSON Lines), so memory use does not depend on the number of rows.
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from inventory.models import StockMovement
+from sales.models import Sale, SaleItem
+from .models import Expense, Loan
+
+CHUNK_SIZE = 2000
+
+
+def _day_range(start, end):
+    """Aware [start, end) datetimes covering the local days ``start`` to ``end``."""
+    after = timezone.make_aware(datetime.combine(start, time.min)) if start else None
+    before = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)) if end else None
+    return after, before
+
+
+def _between(queryset, field, after, before):
+    if after is not None:
+        queryset = queryset.filter(**{f'{field}__gte': after})
+    if before is not None:
+        queryset = queryset.filter(**{f'{field}__lt': before})
+    return queryset
+
+
+def _sales(shop, start, end):
+    after, before = _day_range(start, end)
+    return _between(Sale.objects.filter(shop=shop), 'created_at', after, before).order_by('created_at', 'id')
+
+
+def _sale_items(shop, start, end):
+    after, before = _day_range(start, end)
+    items = _between(SaleItem.objects.filter(sale__shop=shop), 'sale__created_at', after, before)
+    return items.order_by('sale__created_at', 'sale_id', 'id')
+
+
+def _movements(shop, start, end):
+    after, before = _day_range(start, end)
+    return _between(StockMovement.objects.filter(shop=shop), 'date', after, before).order_by('date', 'id')
+
+
+def _expenses(shop, start, end):
+    # ``date`` is already a local date.
+    expenses = Expense.objects.filter(shop=shop)
+    if start:
+        expenses = expenses.filter(date__gte=start)
+    if end:
+        expenses = expenses.filter(date__lte=end)
+    return expenses.order_by('date', 'id')
+
+
+def _loans(shop, start, end):
+    after, before = _day_range(start, end)
+    return _between(Loan.objects.filter(shop=shop), 'created_at', after, before).order_by('created_at', 'id')
+
+
+# name: (queryset builder, [(column, field)])
+DATASETS = {
+    'sales': (_sales, [
+        ('id', 'id'), ('date', 'created_at'), ('facture', 'invoice__number'), ('caissier', 'cashier__username'),
+        ('paiement', 'payment_method'), ('montant', 'total_amount'),
+    ]),
+    'sale_items': (_sale_items, [
+        ('vente', 'sale_id'), ('date', 'sale__created_at'), ('produit_id', 'product_id'), ('produit', 'product_name'),
+        ('quantite', 'quantity'), ('prix', 'price'), ('cout_unitaire', 'unit_cost'), ('sous_total', 'subtotal'),
+    ]),
+    'movements': (_movements, [
+        ('id', 'id'), ('date', 'date'), ('produit_id', 'product_id'), ('produit', 'product__name'),
+        ('type', 'movement_type'), ('quantite', 'quantity'), ('cout_unitaire', 'unit_cost'), ('motif', 'reason'),
+    ]),
+    'expenses': (_expenses, [
+        ('id', 'id'), ('date', 'date'), ('categorie', 'category'), ('montant', 'amount'),
+        ('description', 'description'), ('saisi_par', 'created_by__username'),
+    ]),
+    'loans': (_loans, [
+        ('id', 'id'), ('date', 'created_at'), ('type', 'loan_type'), ('client', 'customer__name'),
+        ('montant', 'amount'), ('rembourse', 'amount_paid'), ('statut', 'status'), ('echeance', 'due_date'),
+    ]),
+}
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat(timespec='seconds')
+    return value
+
+
+def rows(dataset, shop, start=None, end=None):
+    """(columns, iterator of value tuples) of ``dataset`` for ``shop``."""
+    build, columns = DATASETS[dataset]
+    queryset = build(shop, start, end).values_list(*[field for _column, field in columns])
+    values = (tuple(_cell(v) for v in row) for row in queryset.iterator(chunk_size=CHUNK_SIZE))
+    return [column for column, _field in columns], values
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+# Leading characters that make spreadsheet software read a cell as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    # Free text (product names, reasons, descriptions) must not run as a formula.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(columns, values):
+    # BOM so that spreadsheet software reads the file as UTF-8.
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(columns)
+    for row in values:
+        yield writer.writerow([_csv_cell(v) for v in row])
+
+
+def stream_jsonl_gz(columns, values, rows_per_chunk=500):
+    """JSON object per line, gzip-compressed on the fly."""
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    lines = []
+    for row in values:
+        lines.append(json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False))
+        if len(lines) >= rows_per_chunk:
+            chunk = compressor.compress(('\n'.join(lines) + '\n').encode())
+            lines = []
+            if chunk:
+                yield chunk
+    if lines:
+        yield compressor.compress(('\n'.join(lines) + '\n').encode())
+    yield compressor.flush()
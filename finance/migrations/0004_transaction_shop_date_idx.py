@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_shop_catalog_version'),
+        ('finance', '0003_loan_loan_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['shop', 'date', 'id'], name='transaction_shop_date_idx'),
+        ),
+    ]
@@ -29,6 +29,11 @@ class Transaction(models.Model):
     transaction_type = models.CharField(max_length=10, choices=Type.choices)
     related_document = models.CharField(max_length=100, blank=True, null=True) # e.g. "Invoice #123"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'date', 'id'], name='transaction_shop_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.date} - {self.description} ({self.amount})"
 
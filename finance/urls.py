@@ -14,4 +14,5 @@ urlpatterns = [
     
     # Export (Pro)
     path('export/pdf/', views_export.export_accounting_pdf, name='export_accounting_pdf'),
+    path('export/<str:dataset>/', views_export.export_data, name='export_data'),
 ]
@@ -1,8 +1,9 @@
 from rest_framework import viewsets
+from core.api import ConditionalGetMixin, KeysetPagination
 from .models import Expense, Transaction
 from .serializers import ExpenseSerializer, TransactionSerializer
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ExpenseSerializer
 
     def get_queryset(self):
@@ -14,8 +15,13 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(shop=self.request.user.shop, created_by=self.request.user)
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionPagination(KeysetPagination):
+    # A day holds many transactions: seek on (date, id), not on date alone.
+    keys = ('date', 'id')
+
+class TransactionViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
+    pagination_class = TransactionPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -2,9 +2,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
+from core.plans import plan_required
 from .models import Customer, Loan
 
 @login_required
+@plan_required('has_advanced_accounting')
 def loan_list(request):
     shop = request.user.shop
 
@@ -12,10 +14,6 @@ def loan_list(request):
     if request.user.role not in ['ADMIN', 'MANAGER', 'ACCOUNTANT']:
         return render(request, 'finance/upgrade.html') # Or 403
 
-    # Check Medium plan
-    if not shop.has_advanced_accounting: 
-        return render(request, 'finance/upgrade.html')
-
     # Split into Loans (Receivables) and Debts (Payables)
     loans = Loan.objects.filter(shop=shop, loan_type=Loan.LoanType.LOAN).select_related('customer').order_by('-created_at')
     debts = Loan.objects.filter(shop=shop, loan_type=Loan.LoanType.DEBT).select_related('customer').order_by('-created_at')
@@ -26,10 +24,9 @@ def loan_list(request):
     })
 
 @login_required
+@plan_required('has_advanced_accounting')
 def loan_add(request):
     shop = request.user.shop
-    if not shop.has_advanced_accounting:
-        return render(request, 'finance/upgrade.html')
 
     # Get type from GET (default to LOAN)
     loan_type = request.GET.get('type', Loan.LoanType.LOAN)
@@ -1,97 +1,113 @@
+from collections import defaultdict
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, F
-from django.db.models.functions import TruncDay, TruncHour, TruncMonth
+from django.core.cache import cache
+from django.db.models import Sum, Count, F, Q
+from django.db.models.functions import TruncHour, TruncMonth
 from django.utils import timezone
 from datetime import timedelta
-from sales.models import Sale, SaleItem
+from sales.models import Sale, DailySalesSummary, ProductDailySales
+from sales.rollups import STATS_CACHE_TIMEOUT, stats_cache_key
 from inventory.models import Product
+from core.plans import plan_required
 
-@login_required
-def statistics_view(request):
-    shop = request.user.shop
-    
-    # Check permissions (Admin, Manager, Accountant)
-    if request.user.role not in ['ADMIN', 'MANAGER', 'ACCOUNTANT']:
-        return render(request, 'core/403.html') # Need to create 403 or redirect
-    
-    # Check subscription (Medium+)
-    if not shop.has_advanced_accounting:
-        return render(request, 'finance/upgrade.html')
-
-    now = timezone.now()
 
-    # Recent periods
-    period_30d_start = now - timedelta(days=30)
-    period_7d_start = now - timedelta(days=7)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+def _sales_statistics(shop, today, now):
+    """Sales figures of the statistics page, in a fixed number of queries."""
+    # Recent periods (local days, today included)
+    period_30d_start = today - timedelta(days=29)
+    period_7d_start = today - timedelta(days=6)
 
-    qs_all = Sale.objects.filter(shop=shop)
-    qs_30d = qs_all.filter(created_at__gte=period_30d_start)
-    qs_7d = qs_all.filter(created_at__gte=period_7d_start)
-    qs_today = qs_all.filter(created_at__gte=today_start)
+    # Daily rollups, see sales.rollups
+    summary_all = DailySalesSummary.objects.filter(shop=shop)
 
-    # Totals
-    total_rev_all = qs_all.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_rev_30d = qs_30d.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_rev_7d = qs_7d.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_rev_today = qs_today.aggregate(total=Sum('total_amount'))['total'] or 0
-
-    count_all = qs_all.count()
-    count_30d = qs_30d.count()
-    count_7d = qs_7d.count()
-    count_today = qs_today.count()
+    # KPIs: every window in a single pass
+    windows = {
+        'all': Q(),
+        '30d': Q(date__gte=period_30d_start),
+        '7d': Q(date__gte=period_7d_start),
+        'today': Q(date=today),
+    }
+    aggregates = {}
+    for name, condition in windows.items():
+        aggregates[f'total_rev_{name}'] = Sum('revenue', filter=condition, default=0)
+        aggregates[f'count_{name}'] = Sum('sale_count', filter=condition, default=0)
+    stats = summary_all.aggregate(**aggregates)
+
+    stats['avg_order_all'] = float(stats['total_rev_all']) / stats['count_all'] if stats['count_all'] else 0
+    stats['avg_order_30d'] = float(stats['total_rev_30d']) / stats['count_30d'] if stats['count_30d'] else 0
+
+    # Daily trend, payment mix and top cashiers (30d) from one grouped query
+    daily = defaultdict(lambda: 0)
+    payments = defaultdict(lambda: {'total': 0, 'count': 0})
+    cashiers = defaultdict(lambda: {'total': 0, 'count': 0})
+    rows = summary_all.filter(date__gte=period_30d_start).values(
+        'date', 'payment_method', 'cashier__username'
+    ).annotate(total=Sum('revenue'), count=Sum('sale_count')).order_by('date')
+    for row in rows:
+        daily[row['date']] += row['total']
+        for bucket in (payments[row['payment_method']], cashiers[row['cashier__username']]):
+            bucket['total'] += row['total']
+            bucket['count'] += row['count']
+
+    stats['dates'] = [day.strftime('%d/%m') for day in daily]
+    stats['totals'] = [float(total) for total in daily.values()]
+    stats['payments'] = sorted(
+        ({'payment_method': method, **values} for method, values in payments.items()),
+        key=lambda p: p['total'], reverse=True,
+    )
+    stats['top_cashiers'] = sorted(
+        ({'cashier__username': username, **values} for username, values in cashiers.items()),
+        key=lambda c: c['total'], reverse=True,
+    )[:10]
+
+    # Monthly trend
+    monthly = summary_all.annotate(month=TruncMonth('date')).values('month').annotate(total=Sum('revenue')).order_by('month')
+    stats['months'] = []
+    stats['month_totals'] = []
+    for m in monthly:
+        stats['months'].append(m['month'].strftime('%b %Y'))
+        stats['month_totals'].append(float(m['total']))
 
-    avg_order_all = float(total_rev_all) / count_all if count_all else 0
-    avg_order_30d = float(total_rev_30d) / count_30d if count_30d else 0
+    # Top products (30d)
+    stats['top_products'] = list(
+        ProductDailySales.objects.filter(shop=shop, date__gte=period_30d_start).values('product_name')
+        .annotate(total_qty=Sum('quantity'), total_revenue=Sum('revenue')).order_by('-total_revenue')[:10]
+    )
 
-    # Trends: daily sales for last 30 days
-    daily = qs_30d.annotate(day=TruncDay('created_at')).values('day').annotate(total=Sum('total_amount'), count=Count('id')).order_by('day')
-    dates = [d['day'].strftime('%d/%m') for d in daily]
-    totals = [float(d['total']) for d in daily]
+    # Sales by hour (last 7 days), not covered by the daily rollups
+    stats['hourly'] = list(
+        Sale.objects.filter(shop=shop, created_at__gte=now - timedelta(days=7))
+        .annotate(hour=TruncHour('created_at')).values('hour')
+        .annotate(total=Sum('total_amount'), count=Count('id')).order_by('hour')
+    )
+    return stats
 
-    # Monthly trend last 12 months
-    monthly = qs_all.annotate(month=TruncMonth('created_at')).values('month').annotate(total=Sum('total_amount')).order_by('month')
-    months = [m['month'].strftime('%b %Y') for m in monthly]
-    month_totals = [float(m['total']) for m in monthly]
 
-    # Payments breakdown
-    payments = qs_30d.values('payment_method').annotate(total=Sum('total_amount'), count=Count('id')).order_by('-total')
+@login_required
+@plan_required('has_advanced_accounting')
+def statistics_view(request):
+    shop = request.user.shop
 
-    # Top products (30d)
-    top_products = SaleItem.objects.filter(sale__shop=shop, sale__created_at__gte=period_30d_start).values('product_name').annotate(total_qty=Sum('quantity'), total_revenue=Sum('subtotal')).order_by('-total_revenue')[:10]
+    # Check permissions (Admin, Manager, Accountant)
+    if request.user.role not in ['ADMIN', 'MANAGER', 'ACCOUNTANT']:
+        return render(request, 'core/403.html') # Need to create 403 or redirect
 
-    # Top cashiers
-    top_cashiers = qs_30d.values('cashier__username').annotate(total=Sum('total_amount'), count=Count('id')).order_by('-total')[:10]
+    now = timezone.now()
+    today = timezone.localdate()
 
-    # Sales by hour (last 7 days)
-    hourly = qs_7d.annotate(hour=TruncHour('created_at')).values('hour').annotate(total=Sum('total_amount'), count=Count('id')).order_by('hour')
+    # Cached per shop and day; dropped whenever a sale is committed or deleted.
+    key = stats_cache_key(shop.pk)
+    cached = cache.get(key)
+    if cached and cached['date'] == today:
+        stats = cached['stats']
+    else:
+        stats = _sales_statistics(shop, today, now)
+        cache.set(key, {'date': today, 'stats': stats}, STATS_CACHE_TIMEOUT)
 
     # Inventory: low stock
     low_stock = Product.objects.filter(shop=shop, quantity__lte=F('alert_threshold')).order_by('quantity')[:20]
 
-    context = {
-        # KPIs
-        'total_rev_all': total_rev_all,
-        'total_rev_30d': total_rev_30d,
-        'total_rev_7d': total_rev_7d,
-        'total_rev_today': total_rev_today,
-        'count_all': count_all,
-        'count_30d': count_30d,
-        'count_7d': count_7d,
-        'count_today': count_today,
-        'avg_order_all': avg_order_all,
-        'avg_order_30d': avg_order_30d,
-        # Trends
-        'dates': dates,
-        'totals': totals,
-        'months': months,
-        'month_totals': month_totals,
-        'payments': payments,
-        'top_products': top_products,
-        'top_cashiers': top_cashiers,
-        'hourly': hourly,
-        'low_stock': low_stock,
-    }
+    context = dict(stats, low_stock=low_stock)
 
     return render(request, 'finance/statistics_full.html', context)
@@ -3,7 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Sum
 from django.utils import timezone
 from .models import Expense
-from sales.models import Sale
+from sales.models import DailySalesSummary
 from core.models import Shop
 
 @login_required
@@ -15,25 +15,19 @@ def accounting_dashboard(request):
         return redirect('dashboard') # Redirect to general dashboard if not allowed
 
     # Check Plan
-    if shop.plan == Shop.Plan.FREE:
+    if not shop.has_advanced_accounting:
         return render(request, 'finance/upgrade.html') # Teaser
 
     today = timezone.now().date()
     
-    # Calculate Gross Profit (Sales - COGS)
-    from sales.models import SaleItem
-    from django.db.models import F
+    # Gross Profit = Sales - cost of goods sold, from the daily rollups
+    # (unit cost captured on each SaleItem at sale time).
+    totals = DailySalesSummary.objects.filter(shop=shop).aggregate(
+        sales=Sum('revenue', default=0), cost=Sum('cost', default=0)
+    )
+    total_sales = totals['sales']
+    gross_profit = total_sales - totals['cost']
 
-    # Gross Profit = Sum(Selling Price - Purchase Price)
-    # Note: simple version using current product purchase price.
-    gross_profit = SaleItem.objects.filter(sale__shop=shop).annotate(
-        cost=F('quantity') * F('product__purchase_price')
-    ).aggregate(
-        gp=Sum(F('subtotal') - F('cost'))
-    )['gp'] or 0
-    
-    # Calculate Net Profit = Gross Profit - Expenses
-    total_sales = Sale.objects.filter(shop=shop).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
     total_expenses = Expense.objects.filter(shop=shop).aggregate(Sum('amount'))['amount__sum'] or 0
     
     # Expense Breakdown by Category
@@ -44,7 +38,7 @@ def accounting_dashboard(request):
     context = {
         'total_sales': total_sales,
         'gross_profit': gross_profit,
-        'cogs': total_sales - gross_profit, # Cost of Goods Sold
+        'cogs': totals['cost'], # Cost of Goods Sold
         'total_expenses': total_expenses,
         'expense_breakdown': expense_breakdown,
         'profit': net_profit, 
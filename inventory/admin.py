@@ -9,12 +9,14 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'shop', 'category', 'selling_price', 'quantity', 'alert_threshold')
+    list_display = ('name', 'barcode', 'shop', 'category', 'selling_price', 'quantity', 'alert_threshold')
     list_filter = ('shop', 'category')
-    search_fields = ('name',)
+    search_fields = ('name', 'barcode')
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
     list_display = ('product', 'movement_type', 'quantity', 'date')
-    list_filter = ('movement_type', 'date', 'product__shop')
+    list_filter = ('movement_type', 'date', 'shop')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
     date_hierarchy = 'date'
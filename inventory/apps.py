@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class InventoryConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'inventory'
+
+    def ready(self):
+        import inventory.signals
@@ -0,0 +1,393 @@
+"""
+Bulk product import (CSV / XLSX) and mass price or stock updates.
+
+Rows are read lazily from the uploaded file and handled ``chunk_size`` at a
+time, each chunk in its own transaction with a constant number of queries:
+one lookup of the matching products, ``bulk_create`` / ``bulk_update``, one
+catalog version, one search index refresh, and the stock movements written
+with ``bulk_create`` after ``apply_movements`` has valued them. Invalid rows
+are reported with their line number and skipped; the others are kept.
+"""
+import csv
+import io
+import itertools
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Q
+from .catalog import next_catalog_version
+from .models import Category, Product, StockMovement
+from .search import index_products
+from .valuation import apply_movements
+
+IMPORT_CHUNK_SIZE = 500
+# Errors listed in a report; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+# Accepted column names (lowercase, without accents) for each field.
+COLUMN_ALIASES = {
+    'name': ('name', 'nom', 'produit', 'designation', 'libelle'),
+    'barcode': ('barcode', 'sku', 'code', 'code_barre', 'code_barres', 'reference'),
+    'selling_price': ('selling_price', 'price', 'prix', 'prix_vente', 'prix_de_vente'),
+    'purchase_price': ('purchase_price', 'prix_achat', 'prix_d_achat', 'cout'),
+    'quantity': ('quantity', 'quantite', 'stock', 'qte'),
+    'category': ('category', 'categorie', 'famille'),
+    'alert_threshold': ('alert_threshold', 'seuil', 'seuil_alerte', 'alerte'),
+}
+_ALIAS_TO_FIELD = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+
+
+class ImportAborted(ValueError):
+    """The file became unreadable after ``report`` rows were already imported."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def _column_key(header):
+    header = unicodedata.normalize('NFKD', str(header or '')).encode('ascii', 'ignore').decode()
+    key = '_'.join(header.lower().replace("'", ' ').replace('-', ' ').split())
+    return _ALIAS_TO_FIELD.get(key)
+
+
+def _records(header, rows, first_line):
+    fields = [_column_key(h) for h in header]
+    if 'name' not in fields and 'barcode' not in fields:
+        raise ValueError("Colonne 'nom' ou 'code' introuvable dans l'en-tête.")
+    for line, row in enumerate(rows, start=first_line):
+        if not any(cell not in (None, '') for cell in row):
+            continue
+        yield line, {field: cell for field, cell in zip(fields, row) if field}
+
+
+def read_rows(uploaded):
+    """Yield (line number, {field: raw value}) from an uploaded CSV or XLSX file."""
+    if uploaded.name.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("L'import Excel nécessite le paquet openpyxl; utilisez un fichier CSV.")
+        sheet = load_workbook(uploaded, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield from _records(header, rows, 2)
+        return
+
+    text = io.TextIOWrapper(uploaded, encoding='utf-8-sig', errors='replace', newline='')
+    first = text.readline()
+    if not first:
+        return
+    # Spreadsheets set to French locales export with ';'.
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    rows = _csv_rows(csv.reader(itertools.chain([first], text), delimiter=delimiter))
+    yield from _records(next(rows), rows, 2)
+
+
+def _csv_rows(reader):
+    # csv.Error (NUL byte, oversized field...) surfaces lazily, mid-import.
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            raise ValueError(f"Fichier CSV illisible à la ligne {reader.line_num}: {e}.")
+        yield row
+
+
+def _decimal(value, label):
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        number = Decimal(str(value))
+    else:
+        cleaned = str(value).replace('\xa0', '').replace(' ', '').replace(',', '.')
+        try:
+            number = Decimal(cleaned)
+        except InvalidOperation:
+            raise ValueError(f"{label} invalide: {value}")
+    if number < 0:
+        raise ValueError(f"{label} négatif: {value}")
+    return number.quantize(Decimal('0.01'))
+
+
+def _integer(value, label):
+    number = _decimal(value, label)
+    if number is None:
+        return None
+    if number != number.to_integral_value():
+        raise ValueError(f"{label} doit être un entier: {value}")
+    return int(number)
+
+
+def _signed_integer(value, label):
+    if value is None or value == '':
+        return None
+    text = str(value).strip()
+    sign = -1 if text.startswith('-') else 1
+    return sign * _integer(text.removeprefix('-'), label)
+
+
+def _clean(record):
+    """Typed values of an import row; raises ValueError with a readable message."""
+    name = str(record.get('name') or '').strip()
+    barcode = str(record.get('barcode') or '').strip()
+    if isinstance(record.get('barcode'), float) and record['barcode'].is_integer():
+        barcode = str(int(record['barcode'])) # Excel stores EAN codes as numbers
+    if not name and not barcode:
+        raise ValueError("Nom ou code requis.")
+    if len(name) > 200 or len(barcode) > 64:
+        raise ValueError("Nom (200) ou code (64 caractères) trop long.")
+    return {
+        'name': name,
+        'barcode': barcode or None,
+        'selling_price': _decimal(record.get('selling_price'), "Prix de vente"),
+        'purchase_price': _decimal(record.get('purchase_price'), "Prix d'achat"),
+        'quantity': _integer(record.get('quantity'), "Quantité"),
+        'alert_threshold': _integer(record.get('alert_threshold'), "Seuil d'alerte"),
+        'category': str(record.get('category') or '').strip()[:100] or None,
+    }
+
+
+def _categories(shop, names):
+    """{name: Category} for ``names``, creating the missing ones (Pro plans only)."""
+    if not names or not shop.is_pro:
+        return {}
+    found = {}
+    for category in Category.objects.filter(shop=shop, name__in=names).order_by('id'):
+        found.setdefault(category.name, category)
+    missing = [Category(shop=shop, name=name) for name in names if name not in found]
+    for category in Category.objects.bulk_create(missing):
+        found[category.name] = category
+    return found
+
+
+def _write_stock_changes(shop, changes, products, reason):
+    """Ledger movements for ``changes`` ({product_id: delta}), valued and bulk inserted."""
+    movements = [
+        StockMovement(
+            product_id=pk, shop=shop, quantity=abs(delta), reason=reason,
+            movement_type=StockMovement.MovementType.IN if delta > 0 else StockMovement.MovementType.OUT,
+        )
+        for pk, delta in changes.items()
+        if delta
+    ]
+    apply_movements(shop.pk, movements, products=products)
+    StockMovement.objects.bulk_create(movements)
+
+
+def import_products(shop, records, chunk_size=IMPORT_CHUNK_SIZE, reason="Import"):
+    """Create or update the products of ``shop`` from ``records`` ((line, row) pairs).
+
+    A row matches an existing product by barcode (SKU) when it has one,
+    otherwise by exact name. Empty cells keep the current values; the
+    quantity column sets the stock level and the difference is recorded as
+    a movement. Returns an ``ImportReport``. A file that becomes unreadable
+    midway raises ``ImportAborted``: the chunks already committed are kept.
+    """
+    report = ImportReport()
+    seen = {}  # (code|nom|produit, value) -> first line, across chunks
+    records = iter(records)
+    while True:
+        chunk, failure = [], None
+        try:
+            chunk.extend(itertools.islice(records, chunk_size))
+        except ValueError as e:
+            failure = e # Unreadable file: import the rows read so far, then stop.
+        if chunk:
+            with transaction.atomic():
+                _import_chunk(shop, chunk, report, seen, reason)
+        report.errors.sort(key=lambda e: e['line'])
+        if failure is not None:
+            if not chunk and not (report.created or report.updated or report.unchanged or report.error_count):
+                raise failure
+            raise ImportAborted(
+                f"{failure} Import interrompu: {report.created} produit(s) créé(s) et "
+                f"{report.updated} mis à jour avant cette ligne sont conservés.", report,
+            )
+        if len(chunk) < chunk_size:
+            return report
+
+
+def _import_chunk(shop, chunk, report, seen, reason):
+    rows = []
+    for line, record in chunk:
+        try:
+            rows.append((line, _clean(record)))
+        except ValueError as e:
+            report.error(line, str(e))
+    if not rows:
+        return
+
+    barcodes = {row['barcode'] for _line, row in rows if row['barcode']}
+    names = {row['name'] for _line, row in rows if row['name'] and not row['barcode']}
+    existing = Product.objects.select_for_update().filter(shop=shop).filter(
+        Q(barcode__in=barcodes) | Q(name__in=names)
+    )
+    by_barcode, by_name, loaded = {}, {}, {}
+    for product in existing.order_by('id'):
+        loaded[product.pk] = product.quantity
+        if product.barcode:
+            by_barcode[product.barcode] = product
+        by_name.setdefault(product.name, product)
+
+    matched = []
+    for line, row in rows:
+        key = ('code', row['barcode']) if row['barcode'] else ('nom', row['name'])
+        if key in seen:
+            report.error(line, f"Même {key[0]} que la ligne {seen[key]}.")
+            continue
+        seen[key] = line
+        product = by_barcode.get(row['barcode']) if row['barcode'] else by_name.get(row['name'])
+        if product is None and not row['name']:
+            report.error(line, f"Code {row['barcode']} inconnu et nom manquant.")
+            continue
+        if product is not None:
+            # A code and a name can point to the same product: one row per product.
+            if ('produit', product.pk) in seen:
+                report.error(line, f"Même produit que la ligne {seen['produit', product.pk]}.")
+                continue
+            seen['produit', product.pk] = line
+        elif row['selling_price'] is None:
+            report.error(line, "Prix de vente requis pour un nouveau produit.")
+            continue
+        matched.append((line, row, product))
+
+    # Plan limit, checked once for the whole chunk.
+    new_rows = [item for item in matched if item[2] is None]
+    room = shop.product_limit - shop.products.count()
+    if len(new_rows) > room:
+        for line, _row, _product in new_rows[max(room, 0):]:
+            report.error(line, f"Limite du plan atteinte ({shop.product_limit} produits).")
+        rejected = {id(item) for item in new_rows[max(room, 0):]}
+        matched = [item for item in matched if id(item) not in rejected]
+
+    categories = _categories(shop, {row['category'] for _line, row, _p in matched if row['category']})
+    version = next_catalog_version(shop.pk)
+    to_create, to_update, changes = [], [], {}
+    for line, row, product in matched:
+        category = categories.get(row['category'])
+        if product is None:
+            to_create.append(Product(
+                shop=shop, name=row['name'], barcode=row['barcode'], category=category,
+                selling_price=row['selling_price'], purchase_price=row['purchase_price'] or 0,
+                quantity=row['quantity'] or 0, alert_threshold=row['alert_threshold'] or 5,
+                catalog_version=version,
+            ))
+            continue
+        before = (product.name, product.selling_price, product.purchase_price, product.quantity,
+                  product.alert_threshold, product.category_id)
+        if row['name']:
+            product.name = row['name']
+        for field in ('selling_price', 'purchase_price', 'quantity', 'alert_threshold'):
+            if row[field] is not None:
+                setattr(product, field, row[field])
+        if category is not None:
+            product.category = category
+        after = (product.name, product.selling_price, product.purchase_price, product.quantity,
+                 product.alert_threshold, product.category_id)
+        if after == before:
+            report.unchanged += 1
+            continue
+        changes[product.pk] = product.quantity - loaded[product.pk]
+        product.catalog_version = version
+        to_update.append(product)
+
+    created = Product.objects.bulk_create(to_create)
+    for line, product in zip([line for line, _row, p in matched if p is None], created):
+        seen['produit', product.pk] = line
+    if to_update:
+        Product.objects.bulk_update(to_update, [
+            'name', 'selling_price', 'purchase_price', 'quantity', 'alert_threshold', 'category', 'catalog_version',
+        ])
+    index_products(created + to_update)
+    for product in created:
+        changes[product.pk] = product.quantity
+    _write_stock_changes(shop, changes, {p.pk: p for p in created + to_update}, reason)
+    report.created += len(created)
+    report.updated += len(to_update)
+
+
+def apply_updates(shop, updates, reason="Ajustement en masse"):
+    """Apply mass price / stock changes to products of ``shop`` in one transaction.
+
+    ``updates`` is a list of dicts with ``id`` and any of ``selling_price``,
+    ``purchase_price``, ``quantity`` (new level) or ``quantity_delta``.
+    Returns (updated count, [{'index', 'id', 'error'}]); nothing is written
+    if any entry is invalid.
+    """
+    errors, parsed = [], []
+    for index, update in enumerate(updates):
+        try:
+            if not isinstance(update, dict):
+                raise ValueError("Objet attendu.")
+            values = {
+                'selling_price': _decimal(update.get('selling_price'), "Prix de vente"),
+                'purchase_price': _decimal(update.get('purchase_price'), "Prix d'achat"),
+                'quantity': _integer(update.get('quantity'), "Quantité"),
+            }
+            delta = _signed_integer(update.get('quantity_delta'), "quantity_delta")
+            if delta is not None and values['quantity'] is not None:
+                raise ValueError("quantity et quantity_delta sont exclusifs.")
+            pk = update.get('id')
+            if not str(pk).isdigit():
+                raise ValueError(f"id invalide: {pk}")
+            parsed.append((index, int(pk), values, delta))
+        except ValueError as e:
+            errors.append({'index': index, 'id': update.get('id') if isinstance(update, dict) else None, 'error': str(e)})
+    if errors:
+        return 0, errors
+
+    with transaction.atomic():
+        products = Product.objects.select_for_update().filter(shop=shop, id__in={pk for _i, pk, _v, _d in parsed}).in_bulk()
+        changes = {}
+        for index, pk, values, delta in parsed:
+            product = products.get(pk)
+            if product is None:
+                errors.append({'index': index, 'id': pk, 'error': "Produit introuvable."})
+                continue
+            before = product.quantity
+            for field in ('selling_price', 'purchase_price', 'quantity'):
+                if values[field] is not None:
+                    setattr(product, field, values[field])
+            if delta is not None:
+                product.quantity += delta
+            if product.quantity < 0:
+                errors.append({'index': index, 'id': pk, 'error': f"Stock négatif ({product.quantity})."})
+                continue
+            changes[pk] = changes.get(pk, 0) + product.quantity - before
+        if errors:
+            transaction.set_rollback(True)
+            return 0, errors
+        version = next_catalog_version(shop.pk)
+        for product in products.values():
+            product.catalog_version = version
+        Product.objects.bulk_update(products.values(), ['selling_price', 'purchase_price', 'quantity', 'catalog_version'])
+        _write_stock_changes(shop, changes, products, reason)
+    return len(products), []
@@ -0,0 +1,61 @@
+"""
+Versioned POS catalog.
+
+Every change to a product stamps it with a new value of its shop's
+``catalog_version`` counter, and deletions leave a ``DeletedProduct`` row.
+The counter is bumped inside the writing transaction, so a client that
+synced up to version N only needs the products and deletions above N.
+"""
+from django.db.models import F
+from core.models import Shop
+from .models import Product, DeletedProduct
+
+CATALOG_FIELDS = ['id', 'name', 'price', 'stock', 'barcode']
+
+# Product columns that are part of the catalog payload.
+TRACKED_FIELDS = {'name', 'selling_price', 'quantity', 'barcode', 'shop'}
+
+
+def next_catalog_version(shop_id):
+    """Increment and return the catalog version of a shop."""
+    Shop.objects.filter(pk=shop_id).update(catalog_version=F('catalog_version') + 1)
+    return Shop.objects.filter(pk=shop_id).values_list('catalog_version', flat=True).get()
+
+
+def current_catalog_version(shop_id):
+    return Shop.objects.filter(pk=shop_id).values_list('catalog_version', flat=True).get()
+
+
+def get_catalog(shop, since=None):
+    """Return the catalog of ``shop`` in columnar form.
+
+    With ``since`` (a version previously returned by this function) only the
+    products changed and deleted after it are included.
+    """
+    version = current_catalog_version(shop.pk)
+    full = not since or since > version
+
+    products = Product.objects.filter(shop=shop)
+    deleted = []
+    if not full:
+        products = products.filter(catalog_version__gt=since)
+        deleted = list(
+            DeletedProduct.objects.filter(shop=shop, catalog_version__gt=since)
+            .values_list('product_id', flat=True)
+        )
+
+    columns = {field: [] for field in CATALOG_FIELDS}
+    rows = products.order_by('id').values_list('id', 'name', 'selling_price', 'quantity', 'barcode')
+    for pk, name, price, stock, barcode in rows.iterator(chunk_size=2000):
+        columns['id'].append(pk)
+        columns['name'].append(name)
+        columns['price'].append(float(price))
+        columns['stock'].append(stock)
+        columns['barcode'].append(barcode)
+
+    return {
+        'version': version,
+        'full': full,
+        'columns': columns,
+        'deleted': deleted,
+    }
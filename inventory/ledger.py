@@ -0,0 +1,118 @@
+"""
+Point-in-time stock from the StockMovement ledger.
+
+A balance at instant T is the latest ``StockSnapshot`` of the shop taken at
+or before T plus the movements between the snapshot and T, so a query scans
+at most one snapshot interval of the (shop, date) index instead of the whole
+history. ``take_snapshots`` writes the snapshots incrementally (previous
+snapshot + movements since), and ``reconcile`` compares the full ledger with
+``Product.quantity``.
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import Case, F, IntegerField, Max, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Product, StockMovement, StockSnapshot
+
+# Movements committed slightly after their ``date`` (long transactions) must
+# not fall between two snapshots: snapshots stop this far in the past.
+SNAPSHOT_MARGIN = timedelta(minutes=5)
+
+SIGNED_QUANTITY = Case(
+    When(movement_type=StockMovement.MovementType.IN, then=F('quantity')),
+    default=-F('quantity'),
+    output_field=IntegerField(),
+)
+
+
+def _deltas(movements):
+    return dict(
+        movements.order_by().values('product_id').annotate(delta=Sum(SIGNED_QUANTITY)).values_list('product_id', 'delta')
+    )
+
+
+def end_of_day(day):
+    """Aware datetime of the last instant of local ``day``."""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min)) - timedelta(microseconds=1)
+
+
+def stock_at(shop, at, product_ids=None):
+    """Return {product_id: quantity} for the products of ``shop`` at instant ``at``."""
+    snapshots = StockSnapshot.objects.filter(shop=shop)
+    movements = StockMovement.objects.filter(shop=shop, date__lte=at)
+    if product_ids is not None:
+        snapshots = snapshots.filter(product_id__in=product_ids)
+        movements = movements.filter(product_id__in=product_ids)
+
+    base = snapshots.filter(taken_at__lte=at).aggregate(at=Max('taken_at'))['at']
+    balances = {}
+    if base is not None:
+        balances = dict(snapshots.filter(taken_at=base).values_list('product_id', 'quantity'))
+        movements = movements.filter(date__gt=base)
+    for product_id, delta in _deltas(movements).items():
+        balances[product_id] = balances.get(product_id, 0) + delta
+    return balances
+
+
+def stock_series(shop, start, end, product_ids=None):
+    """End-of-day balances between local dates ``start`` and ``end`` (inclusive).
+
+    Returns a list of (date, {product_id: quantity}).
+    """
+    balances = stock_at(shop, end_of_day(start), product_ids)
+    movements = StockMovement.objects.filter(shop=shop, date__gt=end_of_day(start), date__lte=end_of_day(end))
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+    daily = {}
+    rows = (
+        movements.order_by().annotate(day=TruncDate('date'))
+        .values('day', 'product_id').annotate(delta=Sum(SIGNED_QUANTITY))
+    )
+    for row in rows:
+        daily.setdefault(row['day'], []).append((row['product_id'], row['delta']))
+
+    series = [(start, dict(balances))]
+    day = start
+    while day < end:
+        day += timedelta(days=1)
+        for product_id, delta in daily.get(day, ()):
+            balances[product_id] = balances.get(product_id, 0) + delta
+        series.append((day, dict(balances)))
+    return series
+
+
+def take_snapshots(shop, at=None):
+    """Snapshot the ledger balance of every product of ``shop``. Returns the row count."""
+    at = at or timezone.now() - SNAPSHOT_MARGIN
+    previous = StockSnapshot.objects.filter(shop=shop, taken_at__lte=at).aggregate(at=Max('taken_at'))['at']
+    if previous == at:
+        return 0
+    balances = stock_at(shop, at)
+    product_ids = Product.objects.filter(shop=shop).values_list('id', flat=True)
+    return len(StockSnapshot.objects.bulk_create(
+        (
+            StockSnapshot(shop=shop, product_id=product_id, taken_at=at, quantity=balances.get(product_id, 0))
+            for product_id in product_ids.iterator()
+        ),
+        batch_size=1000,
+    ))
+
+
+def reconcile(shop, chunk_size=1000):
+    """Yield (product, ledger_quantity) for each product whose ``quantity`` differs from the ledger.
+
+    Products are read by id ranges of ``chunk_size``, one grouped movement
+    sum per chunk.
+    """
+    products = Product.objects.filter(shop=shop).order_by('id').only('id', 'name', 'quantity', 'purchase_price', 'shop_id')
+    last_id = 0
+    while True:
+        chunk = list(products.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1].pk
+        ledger = _deltas(StockMovement.objects.filter(shop=shop, product_id__in=[p.pk for p in chunk]))
+        for product in chunk:
+            balance = ledger.get(product.pk, 0)
+            if balance != product.quantity:
+                yield product, balance
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from inventory import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the POS product search index (SQLite FTS5) from the products table."
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write("Pas d'index FTS sur cette base, rien à faire.")
+            return
+        with connection.schema_editor() as schema_editor:
+            search.create_index(schema_editor)
+        search._fts_available = None
+        self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import Shop
+from inventory import valuation
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the weighted average cost valuation of the stock by replaying "
+        "the StockMovement ledger (audit). Run snapshot_stock --reconcile --fix "
+        "first if the ledger does not match the product quantities."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', help="Shop id (repeatable). Default: all shops.")
+        parser.add_argument('--check', action='store_true', help="Only report shops whose running valuation differs.")
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('id')
+        if options['shop']:
+            shops = shops.filter(id__in=options['shop'])
+        count = drifts = 0
+        for shop in shops.iterator():
+            current = valuation.shop_value(shop)
+            with transaction.atomic():
+                sid = transaction.savepoint()
+                rebuilt = valuation.rebuild(shop)
+                if options['check']:
+                    transaction.savepoint_rollback(sid)
+            if rebuilt != current:
+                drifts += 1
+                self.stdout.write(f"{shop.name}: {current:.2f} -> {rebuilt:.2f}")
+            count += 1
+        verb = "écart(s) détecté(s)" if options['check'] else "valorisation(s) corrigée(s)"
+        self.stdout.write(self.style.SUCCESS(f"{count} boutique(s), {drifts} {verb}."))
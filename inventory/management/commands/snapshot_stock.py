@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import Shop
+from inventory import ledger
+from inventory.services import record_reconciliation
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a stock snapshot (ledger balance of every product) per shop. "
+        "With --reconcile, compare the StockMovement ledger with Product.quantity instead; "
+        "--fix then records the missing adjustments (ledger only: the valuation "
+        "already follows Product.quantity)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', help="Shop id (repeatable). Default: all shops.")
+        parser.add_argument('--reconcile', action='store_true')
+        parser.add_argument('--fix', action='store_true', help="With --reconcile: write adjustment movements.")
+        parser.add_argument('--chunk', type=int, default=1000, help="Products per reconcile batch.")
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('id')
+        if options['shop']:
+            shops = shops.filter(id__in=options['shop'])
+
+        if options['reconcile']:
+            self._reconcile(shops, options)
+            return
+
+        total = 0
+        for shop in shops.iterator():
+            with transaction.atomic():
+                total += ledger.take_snapshots(shop)
+        self.stdout.write(self.style.SUCCESS(f"{total} solde(s) enregistré(s)."))
+
+    def _reconcile(self, shops, options):
+        drifts = 0
+        for shop in shops.iterator():
+            found = []
+            for product, balance in ledger.reconcile(shop, chunk_size=options['chunk']):
+                drifts += 1
+                self.stdout.write(f"{shop.name} / {product.name} (#{product.pk}): registre={balance} stock={product.quantity}")
+                if options['fix']:
+                    found.append((product, product.quantity - balance))
+                    if len(found) >= options['chunk']:
+                        record_reconciliation(shop, found, "Régularisation inventaire")
+                        found = []
+            if found:
+                record_reconciliation(shop, found, "Régularisation inventaire")
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS("Registre et stocks concordent."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"{drifts} écart(s) régularisé(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{drifts} écart(s) ; relancez avec --fix pour les régulariser."))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_shop_catalog_version'),
+        ('inventory', '0004_product_barcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField()),
+                ('catalog_version', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='catalog_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shop', 'catalog_version'], name='product_catalog_version_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedproduct',
+            name='shop',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deleted_products', to='core.shop'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedproduct',
+            index=models.Index(fields=['shop', 'catalog_version'], name='deleted_product_version_idx'),
+        ),
+    ]
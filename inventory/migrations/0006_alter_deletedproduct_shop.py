@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_shop_catalog_version'),
+        ('inventory', '0005_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deletedproduct',
+            name='shop',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='deleted_products', to='core.shop'),
+        ),
+    ]
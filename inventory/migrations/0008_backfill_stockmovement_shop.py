@@ -0,0 +1,36 @@
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery
+
+CHUNK_SIZE = 10000
+
+
+def backfill_shop(apps, schema_editor):
+    # Copy product.shop_id by id ranges, one short transaction per chunk, so
+    # large ledgers neither hold a long write lock nor restart from zero.
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    Product = apps.get_model('inventory', 'Product')
+    db = schema_editor.connection.alias
+    movements = StockMovement.objects.using(db)
+    last_id = movements.order_by('-id').values_list('id', flat=True).first()
+    if last_id is None:
+        return
+    shop_of_product = Subquery(
+        Product.objects.using(db).filter(pk=OuterRef('product_id')).values('shop_id')[:1]
+    )
+    for start in range(0, last_id + 1, CHUNK_SIZE):
+        with transaction.atomic(using=db):
+            movements.filter(id__gte=start, id__lt=start + CHUNK_SIZE, shop__isnull=True).update(
+                shop_id=shop_of_product
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0007_stockmovement_shop'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_shop, migrations.RunPython.noop),
+    ]
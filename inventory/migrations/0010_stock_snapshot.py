@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_shop_catalog_version'),
+        ('inventory', '0009_stockmovement_shop_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.product')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='core.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shop', 'taken_at'], name='stock_snapshot_shop_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'taken_at'), name='unique_stock_snapshot')],
+            },
+        ),
+    ]
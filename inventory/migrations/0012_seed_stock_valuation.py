@@ -0,0 +1,46 @@
+from decimal import Decimal
+from django.db import migrations, transaction
+
+CHUNK_SIZE = 2000
+
+
+def seed_valuations(apps, schema_editor):
+    # Start every product at its current quantity valued at its purchase price
+    # (what the accounting export showed until now); later movements refine it.
+    Product = apps.get_model('inventory', 'Product')
+    StockValuation = apps.get_model('inventory', 'StockValuation')
+    ShopValuation = apps.get_model('inventory', 'ShopValuation')
+    db = schema_editor.connection.alias
+    totals = {}
+    last_id = 0
+    while True:
+        chunk = list(
+            Product.objects.using(db).filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'shop_id', 'quantity', 'purchase_price')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        rows = []
+        for pk, shop_id, quantity, purchase_price in chunk:
+            value = Decimal(max(quantity, 0)) * (purchase_price or 0)
+            rows.append(StockValuation(product_id=pk, shop_id=shop_id, quantity=quantity, value=value))
+            totals[shop_id] = totals.get(shop_id, 0) + value
+        with transaction.atomic(using=db):
+            StockValuation.objects.using(db).bulk_create(rows, ignore_conflicts=True)
+    ShopValuation.objects.using(db).bulk_create(
+        [ShopValuation(shop_id=shop_id, value=value) for shop_id, value in totals.items()],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0011_stock_valuation'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_valuations, migrations.RunPython.noop),
+    ]
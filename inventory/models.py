@@ -16,26 +16,122 @@ class Product(models.Model):
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='products')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='products')
     name = models.CharField(max_length=200)
+    barcode = models.CharField(max_length=64, blank=True, null=True) # Code-barres / SKU, unique per shop
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     package_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.IntegerField(default=0)
     alert_threshold = models.IntegerField(default=5)
     created_at = models.DateTimeField(auto_now_add=True)
+    catalog_version = models.PositiveBigIntegerField(default=0) # Shop.catalog_version of the last change
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'barcode'], name='unique_product_barcode_per_shop'),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'catalog_version'], name='product_catalog_version_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+class DeletedProduct(models.Model):
+    """
+    Trace d'un produit supprimé, pour la synchronisation incrémentale du catalogue POS.
+    """
+    # No DB constraint: rows are written while a shop's products are cascade-deleted,
+    # and purged once the shop itself is gone (see inventory.signals).
+    shop = models.ForeignKey(Shop, on_delete=models.DO_NOTHING, db_constraint=False, related_name='deleted_products')
+    product_id = models.BigIntegerField()
+    catalog_version = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'catalog_version'], name='deleted_product_version_idx'),
+        ]
+
+    def __str__(self):
+        return f"Produit #{self.product_id} supprimé (v{self.catalog_version})"
+
 class StockMovement(models.Model):
     class MovementType(models.TextChoices):
         IN = 'IN', _('Entrée')
         OUT = 'OUT', _('Sortie')
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='movements')
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='stock_movements') # Copy of product.shop, avoids the join
     quantity = models.IntegerField()
     movement_type = models.CharField(max_length=4, choices=MovementType.choices)
     date = models.DateTimeField(auto_now_add=True)
     reason = models.CharField(max_length=255, blank=True, null=True)
+    # IN: purchase cost per unit; OUT: weighted average cost taken out (see inventory.valuation)
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'date', 'id'], name='stockmove_shop_date_idx'),
+            models.Index(fields=['product', 'date', 'id'], name='stockmove_product_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.shop_id is None and self.product_id:
+            self.shop_id = self.product.shop_id
+        if self._state.adding:
+            # Bulk writers call apply_movements themselves.
+            from .valuation import apply_movements
+            apply_movements(self.shop_id, [self], products={self.product_id: self.product})
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.movement_type} {self.quantity} - {self.product.name}"
+
+class StockSnapshot(models.Model):
+    """
+    Solde d'un produit d'après le registre des mouvements à un instant donné.
+    Written for all products of a shop at once by manage.py snapshot_stock;
+    see inventory.ledger for point-in-time queries.
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='stock_snapshots')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='snapshots')
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='unique_stock_snapshot'),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'taken_at'], name='stock_snapshot_shop_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.taken_at}: {self.quantity}"
+
+class StockValuation(models.Model):
+    """
+    Valorisation au coût moyen pondéré d'un produit.
+    Updated by inventory.valuation for every stock movement.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='valuation')
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='stock_valuations')
+    quantity = models.IntegerField(default=0)
+    value = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+
+    @property
+    def average_cost(self):
+        return self.value / self.quantity if self.quantity > 0 else None
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} = {self.value}"
+
+class ShopValuation(models.Model):
+    """
+    Valeur totale du stock d'une boutique (somme des StockValuation), lue en temps constant.
+    """
+    shop = models.OneToOneField(Shop, on_delete=models.CASCADE, related_name='valuation')
+    value = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+
+    def __str__(self):
+        return f"{self.shop_id}: {self.value}"
@@ -0,0 +1,107 @@
+"""
+Full-text product search used by the POS search box.
+
+On SQLite the product names are indexed in an FTS5 table
+(``inventory_product_fts``) with a diacritics-folding tokenizer and prefix
+indexes, so "creme br" finds "Crème brûlée" without scanning the products
+table. The index is kept in sync by the Product post_save/post_delete
+signals; bulk writes must call ``index_products``. Other backends fall back
+to token-wise ``icontains`` matching.
+"""
+import re
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from .models import Product
+
+FTS_TABLE = 'inventory_product_fts'
+
+CREATE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, shop_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')"
+)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_fts_available = None
+
+
+def fts_available():
+    """Whether the FTS5 index exists on the current database (checked once)."""
+    global _fts_available
+    if _fts_available is None:
+        if connection.vendor != 'sqlite':
+            _fts_available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+                _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def create_index(schema_editor):
+    """Create and fill the FTS5 table. Used by the migration and rebuild command."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_FTS_SQL)
+    schema_editor.execute(f"DELETE FROM {FTS_TABLE}")
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE}(rowid, name, shop_id) SELECT id, name, shop_id FROM inventory_product"
+    )
+
+
+def index_products(products):
+    """Add or refresh the index entries of ``products``."""
+    if not fts_available():
+        return
+    rows = [(p.pk, p.name, p.shop_id) for p in products]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, name, shop_id) VALUES (%s, %s, %s)", rows
+            )
+
+
+def unindex_products(product_ids):
+    if not fts_available():
+        return
+    rows = [(pk,) for pk in product_ids]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", rows)
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query or '')
+
+
+def search_products(shop, query, limit=10):
+    """Return up to ``limit`` products of ``shop`` matching ``query``, best first.
+
+    Every token of the query must match the start of a word of the product
+    name (prefix match), ignoring case and accents. Names starting with the
+    first token come first, then by relevance.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return list(Product.objects.filter(shop=shop)[:limit])
+
+    if fts_available():
+        match = ' '.join(f'"{t}"*' for t in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND shop_id = %s "
+                "ORDER BY (name LIKE %s) DESC, rank LIMIT %s",
+                [match, shop.pk, tokens[0] + '%', limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        found = Product.objects.filter(shop=shop).in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+    condition = Q()
+    for t in tokens:
+        condition &= Q(name__icontains=t)
+    return list(
+        Product.objects.filter(shop=shop).filter(condition).annotate(
+            _rank=Case(When(name__istartswith=tokens[0], then=Value(0)), default=Value(1), output_field=IntegerField())
+        ).order_by('_rank', 'name')[:limit]
+    )
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, When
+from .catalog import next_catalog_version
+from .models import Product, StockMovement
+from .valuation import average_costs
+
+
+class InsufficientStock(ValueError):
+    """Raised by ``reserve_stock`` when some products cannot cover the request.
+
+    ``failures`` lists one dict per short product with ``product``, ``name``,
+    ``requested`` and ``available``.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        if not failures:
+            super().__init__("Stock modifié pendant la vente, veuillez réessayer.")
+            return
+        first = failures[0]
+        super().__init__(
+            f"Stock insuffisant pour '{first['name']}'. Disponible: {first['available']}"
+        )
+
+
+class _Shortfall(Exception):
+    pass
+
+
+def _shortfalls(shop, quantities):
+    current = {
+        pk: (name, qty)
+        for pk, name, qty in Product.objects.filter(shop=shop, id__in=quantities).values_list('id', 'name', 'quantity')
+    }
+    failures = []
+    for product_id, qty in quantities.items():
+        name, available = current.get(product_id, (str(product_id), 0))
+        if available < qty:
+            failures.append({'product': product_id, 'name': name, 'requested': qty, 'available': available})
+    return failures
+
+
+def reserve_stock(shop, quantities, products=None):
+    """Atomically take ``quantities`` ({product_id: units}) out of the stock of ``shop``.
+
+    All decrements are applied by one ``UPDATE ... SET quantity = quantity - n
+    WHERE id = ... AND quantity >= n`` statement, so two concurrent sales can
+    never both take the last unit: the database re-checks the condition
+    against the committed row. Either every product is decremented or none
+    is, and ``InsufficientStock`` reports the products that were short.
+    The touched products are stamped with a new catalog version.
+
+    ``products`` is an optional {id: Product} map whose in-memory quantities
+    are kept in step.
+    """
+    quantities = {pk: qty for pk, qty in quantities.items() if qty}
+    if not quantities:
+        return
+
+    condition = Q()
+    whens = []
+    for product_id, qty in quantities.items():
+        condition |= Q(id=product_id, quantity__gte=qty)
+        whens.append(When(id=product_id, then=F('quantity') - qty))
+
+    for _attempt in range(3):
+        try:
+            with transaction.atomic():
+                updated = Product.objects.filter(shop=shop).filter(condition).update(
+                    quantity=Case(*whens, output_field=IntegerField()),
+                    catalog_version=next_catalog_version(shop.pk),
+                )
+                if updated != len(quantities):
+                    # Roll back the rows that did match before reporting.
+                    raise _Shortfall
+            break
+        except _Shortfall:
+            failures = _shortfalls(shop, quantities)
+            if failures:
+                raise InsufficientStock(failures)
+            # Restocked between the UPDATE and the re-read: try again.
+    else:
+        raise InsufficientStock([])
+
+    if products:
+        for product_id, qty in quantities.items():
+            if product_id in products:
+                products[product_id].quantity -= qty
+
+
+def record_adjustment(product, delta, reason):
+    """Write the ledger movement for a manual change of ``delta`` units to ``product``."""
+    if not delta:
+        return None
+    return StockMovement.objects.create(
+        product=product,
+        shop_id=product.shop_id,
+        quantity=abs(delta),
+        movement_type=StockMovement.MovementType.IN if delta > 0 else StockMovement.MovementType.OUT,
+        reason=reason,
+    )
+
+
+def record_reconciliation(shop, drifts, reason):
+    """Write the movements bringing the ledger in line with ``Product.quantity``.
+
+    ``drifts`` is a list of (product, delta). The valuation already follows
+    the physical stock (it was seeded from ``Product.quantity``), so these
+    movements are bulk inserted without going through ``apply_movements``;
+    they carry the current average cost for the record.
+    """
+    costs = average_costs([product for product, _delta in drifts])
+    return StockMovement.objects.bulk_create([
+        StockMovement(
+            product=product,
+            shop=shop,
+            quantity=abs(delta),
+            movement_type=StockMovement.MovementType.IN if delta > 0 else StockMovement.MovementType.OUT,
+            unit_cost=costs[product.pk],
+            reason=reason,
+        )
+        for product, delta in drifts
+        if delta
+    ])
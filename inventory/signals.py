@@ -0,0 +1,49 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from core.models import Shop
+from .models import Product, DeletedProduct
+from .search import index_products, unindex_products
+from .catalog import TRACKED_FIELDS, next_catalog_version
+from .valuation import remove_product
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, created, update_fields=None, **kwargs):
+    # Stock-only saves don't touch the indexed columns.
+    if update_fields is not None and not {'name', 'shop'} & set(update_fields):
+        return
+    index_products([instance])
+
+
+@receiver(post_save, sender=Product)
+def stamp_catalog_version(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not TRACKED_FIELDS & set(update_fields):
+        return
+    instance.catalog_version = next_catalog_version(instance.shop_id)
+    Product.objects.filter(pk=instance.pk).update(catalog_version=instance.catalog_version)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_product_valuation(sender, instance, **kwargs):
+    remove_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    unindex_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def record_deleted_product(sender, instance, **kwargs):
+    DeletedProduct.objects.create(
+        shop_id=instance.shop_id,
+        product_id=instance.pk,
+        catalog_version=next_catalog_version(instance.shop_id),
+    )
+
+
+@receiver(post_delete, sender=Shop)
+def purge_deleted_products(sender, instance, **kwargs):
+    # Sent after the shop's products, so this also drops the rows recorded
+    # while cascading.
+    DeletedProduct.objects.filter(shop_id=instance.pk).delete()
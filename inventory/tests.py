@@ -0,0 +1,254 @@
+import random
+import threading
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from core.models import Shop, User
+from inventory import ledger, valuation
+from inventory.bulk import ImportAborted, import_products, read_rows
+from inventory.catalog import get_catalog
+from inventory.models import Product, ShopValuation, StockMovement, StockValuation
+from inventory.services import InsufficientStock, record_adjustment
+from sales import audit
+from sales.models import SaleItem
+from sales.services import commit_sale
+
+
+class StockReservationStressTest(TransactionTestCase):
+    """Several threads sell the same products until stock runs out."""
+
+    THREADS = 6
+    PRODUCTS = 3
+    STOCK = 40
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='stress', password='stress')
+        self.shop = Shop.objects.create(name='Stress', owner=self.owner)
+        self.product_ids = [
+            Product.objects.create(shop=self.shop, name=f'Stress {i}', selling_price=100, quantity=self.STOCK).pk
+            for i in range(self.PRODUCTS)
+        ]
+
+    def tearDown(self):
+        audit.flush() # Before the test database goes away.
+
+    def _worker(self, seed, sold, lock):
+        rng = random.Random(seed)
+        exhausted = set()
+        try:
+            while len(exhausted) < len(self.product_ids):
+                basket = rng.sample(self.product_ids, rng.randint(1, len(self.product_ids)))
+                items = [{'product': pk, 'quantity': rng.randint(1, 3), 'price': 100} for pk in basket]
+                try:
+                    commit_sale(self.shop, self.owner, items)
+                except InsufficientStock as e:
+                    exhausted.update(f['product'] for f in e.failures if f['available'] == 0)
+                    continue
+                except OperationalError:
+                    continue # Database locked: the sale was rolled back, retry.
+                with lock:
+                    for item in items:
+                        sold[item['product']] += item['quantity']
+        finally:
+            connection.close()
+
+    def test_no_oversell_and_ledger_matches(self):
+        sold = {pk: 0 for pk in self.product_ids}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=self._worker, args=(seed, sold, lock)) for seed in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for pk in self.product_ids:
+            quantity = Product.objects.values_list('quantity', flat=True).get(pk=pk)
+            items = SaleItem.objects.filter(product_id=pk).aggregate(q=Sum('quantity'))['q'] or 0
+            moved = StockMovement.objects.filter(
+                product_id=pk, movement_type=StockMovement.MovementType.OUT
+            ).aggregate(q=Sum('quantity'))['q'] or 0
+            self.assertGreaterEqual(quantity, 0)
+            self.assertEqual(self.STOCK - quantity, sold[pk])
+            self.assertEqual(items, sold[pk])
+            self.assertEqual(moved, sold[pk])
+
+
+class CatalogDeltaTest(TestCase):
+    """``get_catalog(since=...)`` returns the changes and deletions after a version."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='catalog', password='catalog')
+        self.shop = Shop.objects.create(name='Catalog', owner=self.owner)
+        self.tea, self.rice, self.salt = (
+            Product.objects.create(shop=self.shop, name=name, selling_price=100, quantity=10)
+            for name in ('Thé', 'Riz', 'Sel')
+        )
+
+    def test_full_catalog(self):
+        catalog = get_catalog(self.shop)
+        self.assertTrue(catalog['full'])
+        self.assertEqual(catalog['columns']['id'], [self.tea.pk, self.rice.pk, self.salt.pk])
+        self.assertEqual(catalog['version'], Shop.objects.get(pk=self.shop.pk).catalog_version)
+        self.assertEqual(catalog['deleted'], [])
+
+    def test_delta_has_changes_and_tombstones(self):
+        since = get_catalog(self.shop)['version']
+        self.tea.selling_price = 120
+        self.tea.save()
+        self.salt.alert_threshold = 2
+        self.salt.save(update_fields=['alert_threshold']) # Not part of the catalog
+        rice_id = self.rice.pk
+        self.rice.delete()
+
+        delta = get_catalog(self.shop, since=since)
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['columns']['id'], [self.tea.pk])
+        self.assertEqual(delta['columns']['price'], [120.0])
+        self.assertEqual(delta['deleted'], [rice_id])
+
+        latest = get_catalog(self.shop, since=delta['version'])
+        self.assertEqual((latest['columns']['id'], latest['deleted']), ([], []))
+
+    def test_unknown_version_gets_the_full_catalog(self):
+        version = get_catalog(self.shop)['version']
+        self.salt.delete()
+        catalog = get_catalog(self.shop, since=version + 100)
+        self.assertTrue(catalog['full'])
+        self.assertEqual(catalog['columns']['id'], [self.tea.pk, self.rice.pk])
+        self.assertEqual(catalog['deleted'], [])
+
+
+class ProductImportTest(TestCase):
+    """Duplicate rows, plan limit and unreadable files in ``import_products``."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='import', password='import')
+        self.shop = Shop.objects.create(name='Import', owner=self.owner, plan=Shop.Plan.PRO)
+        self.tea = Product.objects.create(shop=self.shop, name='Thé', barcode='T1', selling_price=100, quantity=5)
+
+    def _import(self, rows, **kwargs):
+        return import_products(self.shop, enumerate(rows, start=2), **kwargs)
+
+    def test_duplicates_are_reported_once_per_product(self):
+        report = self._import([
+            {'name': 'Riz', 'barcode': 'R1', 'selling_price': '250'},
+            {'name': 'Riz bis', 'barcode': 'R1', 'selling_price': '260'},
+            {'barcode': 'T1', 'quantity': '8'},
+            {'name': 'Thé', 'selling_price': '90'}, # Same product as the code T1
+            {'name': 'Sel', 'selling_price': '50'},
+            {'name': 'Sel', 'selling_price': '55'},
+        ], chunk_size=2)
+
+        self.assertEqual((report.created, report.updated, report.error_count), (2, 1, 3))
+        self.assertEqual([(e['line'], e['error']) for e in report.errors], [
+            (3, "Même code que la ligne 2."),
+            (5, "Même produit que la ligne 4."),
+            (7, "Même nom que la ligne 6."),
+        ])
+        self.tea.refresh_from_db()
+        self.assertEqual((self.tea.quantity, self.tea.selling_price), (8, 100))
+        self.assertEqual(Product.objects.get(shop=self.shop, barcode='R1').name, 'Riz')
+        moved = StockMovement.objects.filter(product=self.tea).values_list('movement_type', 'quantity')
+        self.assertEqual(list(moved), [(StockMovement.MovementType.IN, 3)])
+
+    def test_plan_limit(self):
+        self.shop.plan = Shop.Plan.FREE
+        self.shop.save()
+        Product.objects.bulk_create(
+            Product(shop=self.shop, name=f'P{i}', selling_price=1) for i in range(self.shop.product_limit - 2)
+        )
+        report = self._import([{'name': f'New {i}', 'selling_price': '10'} for i in range(3)] + [{'barcode': 'T1', 'quantity': '1'}])
+
+        self.assertEqual((report.created, report.updated, report.error_count), (1, 1, 2))
+        self.assertEqual({e['line'] for e in report.errors}, {3, 4})
+        self.assertEqual(self.shop.products.count(), self.shop.product_limit)
+
+    def test_unreadable_line_keeps_the_rows_before_it(self):
+        lines = ['nom,code,prix'] + [f'N{i},C{i},10' for i in range(5)] + ['X,"' + 'x' * 140000 + '",10', 'Y,CY,10']
+        upload = SimpleUploadedFile('products.csv', '\n'.join(lines).encode())
+        with self.assertRaises(ImportAborted) as aborted:
+            import_products(self.shop, read_rows(upload), chunk_size=2)
+
+        self.assertIn('ligne 7', str(aborted.exception))
+        self.assertEqual(aborted.exception.report.created, 5)
+        self.assertEqual(self.shop.products.filter(barcode__startswith='C').count(), 5)
+        self.assertFalse(self.shop.products.filter(barcode='CY').exists())
+
+    def test_unreadable_first_line_is_a_plain_error(self):
+        upload = SimpleUploadedFile('products.csv', ('nom,"' + 'x' * 140000 + '"\n').encode())
+        with self.assertRaises(ValueError) as error:
+            import_products(self.shop, read_rows(upload))
+        self.assertNotIsInstance(error.exception, ImportAborted)
+
+
+class StockValuationTest(TestCase):
+    """Running WAC valuations against a full ``valuation.rebuild`` of the ledger."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='valuation', password='valuation')
+        self.shop = Shop.objects.create(name='Valuation', owner=self.owner)
+        self.tea = Product.objects.create(shop=self.shop, name='Thé', selling_price=30, purchase_price=10)
+        self.rice = Product.objects.create(shop=self.shop, name='Riz', selling_price=9, purchase_price=5)
+
+    def _move(self, product, movement_type, quantity, unit_cost=None):
+        StockMovement.objects.create(
+            product=product, quantity=quantity, movement_type=movement_type, unit_cost=unit_cost, reason='Test',
+        )
+        Product.objects.filter(pk=product.pk).update(
+            quantity=product.quantity + (quantity if movement_type == StockMovement.MovementType.IN else -quantity)
+        )
+        product.refresh_from_db()
+
+    def _state(self):
+        rows = StockValuation.objects.filter(shop=self.shop).values_list('product_id', 'quantity', 'value')
+        costs = StockMovement.objects.filter(shop=self.shop).order_by('id').values_list('unit_cost', flat=True)
+        return {pk: (quantity, value) for pk, quantity, value in rows}, list(costs), valuation.shop_value(self.shop)
+
+    def _history(self):
+        IN, OUT = StockMovement.MovementType.IN, StockMovement.MovementType.OUT
+        self._move(self.tea, IN, 10, unit_cost=10)
+        self._move(self.tea, IN, 10, unit_cost=20)
+        commit_sale(self.shop, self.owner, [{'product': self.tea.pk, 'quantity': 4}]) # Out at 15
+        self.tea.refresh_from_db()
+        self._move(self.tea, IN, 5) # Purchase price
+        self._move(self.rice, IN, 3, unit_cost=7)
+        record_adjustment(self.rice, -3, 'Casse')
+
+    def test_incremental_matches_rebuild(self):
+        self._history()
+        incremental = self._state()
+        self.assertEqual(incremental[0][self.tea.pk], (21, 290))
+        self.assertEqual(incremental[0][self.rice.pk], (0, 0))
+        self.assertEqual(incremental[1], [10, 20, 15, 10, 7, 7])
+        self.assertEqual(incremental[2], 290)
+
+        self.assertEqual(valuation.rebuild(self.shop), 290)
+        self.assertEqual(self._state(), incremental)
+
+    def test_rebuild_repairs_drifted_valuations(self):
+        self._history()
+        incremental = self._state()
+        StockValuation.objects.filter(shop=self.shop).update(value=0)
+        ShopValuation.objects.filter(shop=self.shop).update(value=1)
+        StockMovement.objects.filter(shop=self.shop, movement_type=StockMovement.MovementType.OUT).update(unit_cost=99)
+
+        valuation.rebuild(self.shop)
+        self.assertEqual(self._state(), incremental)
+
+    def test_reconcile_fix_keeps_the_valuation(self):
+        # Stock and valuation seeded without ledger movements (products predating the ledger).
+        Product.objects.filter(pk=self.tea.pk).update(quantity=50)
+        StockValuation.objects.create(product=self.tea, shop=self.shop, quantity=50, value=2000)
+        ShopValuation.objects.create(shop=self.shop, value=2000)
+
+        call_command('snapshot_stock', reconcile=True, fix=True, shop=[self.shop.pk], stdout=StringIO())
+
+        movement = StockMovement.objects.get(product=self.tea)
+        self.assertEqual((movement.movement_type, movement.quantity, movement.unit_cost), (StockMovement.MovementType.IN, 50, 40))
+        self.assertEqual(list(ledger.reconcile(self.shop)), [])
+        self.assertEqual(StockValuation.objects.values_list('quantity', 'value').get(product=self.tea), (50, 2000))
+        self.assertEqual(valuation.shop_value(self.shop), 2000)
+        self.assertEqual(valuation.rebuild(self.shop), 2000)
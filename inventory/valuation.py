@@ -0,0 +1,161 @@
+"""
+Weighted average cost (WAC) valuation of the stock.
+
+Each product keeps a running ``StockValuation`` (quantity, total value) and
+each shop a ``ShopValuation`` total, both updated by ``apply_movements`` for
+every StockMovement in the transaction that writes it:
+
+- IN adds ``quantity * unit_cost`` (the purchase price when no cost is given);
+- OUT removes ``quantity * average cost`` and records that average on the
+  movement, which is also the cost of goods sold for sale lines.
+
+Nothing is ever recomputed from scratch; ``rebuild`` replays the ledger for
+audits (manage.py rebuild_stock_valuation).
+"""
+from decimal import Decimal
+from django.db.models import F
+from .models import Product, ShopValuation, StockMovement, StockValuation
+
+ZERO = Decimal(0)
+COST_PLACES = Decimal('0.0001')
+
+
+class _State:
+    __slots__ = ('quantity', 'value', 'fallback')
+
+    def __init__(self, quantity, value, fallback):
+        self.quantity = quantity
+        self.value = Decimal(value)
+        self.fallback = Decimal(fallback or 0)
+
+    def average(self):
+        if self.quantity > 0:
+            return (self.value / self.quantity).quantize(COST_PLACES)
+        return self.fallback
+
+    def apply(self, movement):
+        if movement.movement_type == StockMovement.MovementType.IN:
+            cost = self.fallback if movement.unit_cost is None else Decimal(movement.unit_cost)
+            movement.unit_cost = cost
+            self.value += cost * movement.quantity
+            self.quantity += movement.quantity
+        else:
+            if movement.unit_cost is None:
+                movement.unit_cost = self.average()
+            self.value -= Decimal(movement.unit_cost) * movement.quantity
+            self.quantity -= movement.quantity
+        if self.quantity <= 0:
+            # No stock left: nothing to value, drop rounding residue.
+            self.value = ZERO
+
+
+def average_costs(products):
+    """Return {product_id: current average unit cost} for Product instances."""
+    products = {p.pk: p for p in products}
+    if not products:
+        return {}
+    rows = StockValuation.objects.filter(product_id__in=products).values_list('product_id', 'quantity', 'value')
+    costs = {pk: _State(0, 0, p.purchase_price).average() for pk, p in products.items()}
+    for pk, quantity, value in rows:
+        costs[pk] = _State(quantity, value, products[pk].purchase_price).average()
+    return costs
+
+
+def apply_movements(shop_id, movements, products=None):
+    """Fold ``movements`` (saved or not, oldest first) into the running valuations.
+
+    Fills ``unit_cost`` on movements that have none; call it before
+    ``bulk_create`` to store those costs. ``products`` is an optional
+    {id: Product} map used for the purchase price fallback.
+    """
+    movements = [m for m in movements if m.product_id]
+    if not movements:
+        return
+    product_ids = {m.product_id for m in movements}
+    products = dict(products or {})
+    missing = product_ids - set(products)
+    if missing:
+        products.update(Product.objects.filter(id__in=missing).only('id', 'purchase_price').in_bulk())
+
+    rows = StockValuation.objects.select_for_update().filter(product_id__in=product_ids).in_bulk(field_name='product_id')
+    states = {}
+    for pk in product_ids:
+        row = rows.get(pk)
+        fallback = products[pk].purchase_price if pk in products else 0
+        states[pk] = _State(row.quantity, row.value, fallback) if row else _State(0, 0, fallback)
+    before = sum((s.value for s in states.values()), ZERO)
+
+    for movement in movements:
+        states[movement.product_id].apply(movement)
+
+    to_update, to_create = [], []
+    for pk, state in states.items():
+        row = rows.get(pk)
+        if row is None:
+            to_create.append(StockValuation(product_id=pk, shop_id=shop_id, quantity=state.quantity, value=state.value))
+        else:
+            row.quantity, row.value = state.quantity, state.value
+            to_update.append(row)
+    if to_update:
+        StockValuation.objects.bulk_update(to_update, ['quantity', 'value'])
+    if to_create:
+        StockValuation.objects.bulk_create(to_create)
+
+    delta = sum((s.value for s in states.values()), ZERO) - before
+    if delta and not ShopValuation.objects.filter(shop_id=shop_id).update(value=F('value') + delta):
+        ShopValuation.objects.create(shop_id=shop_id, value=delta)
+
+
+def remove_product(product):
+    """Take a deleted product's value out of its shop total."""
+    value = StockValuation.objects.filter(product=product).values_list('value', flat=True).first()
+    if value:
+        ShopValuation.objects.filter(shop_id=product.shop_id).update(value=F('value') - value)
+
+
+def shop_value(shop):
+    """Current stock value of ``shop`` (one primary-key lookup)."""
+    return ShopValuation.objects.filter(shop=shop).values_list('value', flat=True).first() or ZERO
+
+
+def rebuild(shop, chunk_size=2000):
+    """Replay the whole movement ledger of ``shop`` and rewrite its valuations.
+
+    Movements are streamed in (product, date, id) order in a single pass;
+    recomputed OUT costs are written back in batches. Returns the shop value.
+    """
+    fallbacks = dict(Product.objects.filter(shop=shop).values_list('id', 'purchase_price'))
+    states = {pk: _State(0, 0, price) for pk, price in fallbacks.items()}
+    changed = []
+
+    movements = (
+        StockMovement.objects.filter(shop=shop).order_by('product_id', 'date', 'id')
+        .only('id', 'product_id', 'movement_type', 'quantity', 'unit_cost')
+    )
+    for movement in movements.iterator(chunk_size=chunk_size):
+        state = states.get(movement.product_id)
+        if state is None:
+            continue
+        stored = movement.unit_cost
+        if movement.movement_type == StockMovement.MovementType.OUT:
+            movement.unit_cost = None
+        state.apply(movement)
+        if movement.unit_cost != stored:
+            changed.append(movement)
+        if len(changed) >= chunk_size:
+            StockMovement.objects.bulk_update(changed, ['unit_cost'])
+            changed = []
+    if changed:
+        StockMovement.objects.bulk_update(changed, ['unit_cost'])
+
+    StockValuation.objects.filter(shop=shop).delete()
+    StockValuation.objects.bulk_create(
+        (
+            StockValuation(product_id=pk, shop=shop, quantity=state.quantity, value=state.value)
+            for pk, state in states.items()
+        ),
+        batch_size=chunk_size,
+    )
+    total = sum((state.value for state in states.values()), ZERO)
+    ShopValuation.objects.update_or_create(shop=shop, defaults={'value': total})
+    return total
@@ -1,9 +1,29 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 from .models import Product, Category, StockMovement
 from .serializers import ProductSerializer, CategorySerializer, StockMovementSerializer
+from .bulk import ImportAborted, apply_updates, import_products, read_rows
+from .catalog import get_catalog
+from .services import record_adjustment
+from .ledger import end_of_day, stock_at, stock_series
+from core.api import ApiCursorPagination, ConditionalGetMixin, DateCursorPagination
 
-class CategoryViewSet(viewsets.ModelViewSet):
+# Rows locked and rewritten by one bulk request.
+BULK_MAX_UPDATES = 1000
+
+class CategoryPagination(ApiCursorPagination):
+    ordering = ('name', 'id')
+
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
+    pagination_class = CategoryPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -14,13 +34,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(shop=self.request.user.shop)
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
 
     def get_queryset(self):
         user = self.request.user
         if user.shop:
-            return Product.objects.filter(shop=user.shop)
+            return Product.objects.filter(shop=user.shop).select_related('category')
         return Product.objects.none()
 
     def perform_create(self, serializer):
@@ -33,13 +53,147 @@ class ProductViewSet(viewsets.ModelViewSet):
             from rest_framework.exceptions import ValidationError
             raise ValidationError(f"Plan limit reached ({shop.product_limit} products). Upgrade to add more.")
 
-        serializer.save(shop=shop)
+        with transaction.atomic():
+            product = serializer.save(shop=shop)
+            record_adjustment(product, product.quantity, "Stock initial")
+
+    def perform_update(self, serializer):
+        before = serializer.instance.quantity
+        with transaction.atomic():
+            product = serializer.save()
+            record_adjustment(product, product.quantity - before, "Ajustement manuel")
+
+    @method_decorator(gzip_page)
+    @action(detail=False, methods=['get'])
+    def catalog(self, request):
+        """
+        Catalogue POS compact (colonnes) pour la PWA.
+        ``?since=<version>`` returns only the products changed and deleted after that version.
+        """
+        shop = request.user.shop
+        if not shop:
+            return Response({'error': 'User has no shop.'}, status=400)
+
+        try:
+            since = int(request.query_params.get('since') or 0)
+        except ValueError:
+            since = 0
+
+        etag = f'"catalog-{shop.pk}-{shop.catalog_version}-{since}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers={'ETag': etag})
+
+        data = get_catalog(shop, since=since)
+        etag = f'"catalog-{shop.pk}-{data["version"]}-{since}"'
+        return Response(data, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Ajustements de prix / stock en masse: ``{"updates": [{"id", "selling_price",
+        "purchase_price", "quantity" | "quantity_delta"}], "reason"}``. All or nothing.
+        """
+        if request.user.role not in ['ADMIN', 'MANAGER']:
+            return Response({'error': 'Accès refusé.'}, status=403)
+        shop = request.user.shop
+        updates = request.data.get('updates') if isinstance(request.data, dict) else None
+        if not shop or not isinstance(updates, list) or not updates:
+            return Response({'error': 'Liste updates requise.'}, status=400)
+        if len(updates) > BULK_MAX_UPDATES:
+            return Response({'error': f'{BULK_MAX_UPDATES} mises à jour au plus par requête.'}, status=400)
+        reason = str(request.data.get('reason') or 'Ajustement en masse')[:255]
+        updated, errors = apply_updates(shop, updates, reason=reason)
+        if errors:
+            return Response({'updated': 0, 'errors': errors}, status=400)
+        return Response({'updated': updated})
 
-class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """Import CSV / XLSX (champ ``file``); renvoie le rapport avec les erreurs par ligne."""
+        if request.user.role not in ['ADMIN', 'MANAGER']:
+            return Response({'error': 'Accès refusé.'}, status=403)
+        shop = request.user.shop
+        upload = request.FILES.get('file')
+        if not shop or upload is None:
+            return Response({'error': 'Fichier requis (champ file).'}, status=400)
+        try:
+            report = import_products(shop, read_rows(upload))
+        except ImportAborted as e:
+            return Response({'error': str(e), **e.report.as_dict()}, status=400)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=400)
+        return Response(report.as_dict())
+
+    @action(detail=True, methods=['get'])
+    def movements(self, request, pk=None):
+        """Historique des mouvements de stock du produit, du plus récent au plus ancien."""
+        product = self.get_object()
+        queryset = StockMovement.objects.filter(product=product).select_related('product')
+        paginator = StockMovementPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = StockMovementSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+class StockMovementPagination(DateCursorPagination):
+    # Seeks on the (shop|product, date, id) indexes: constant cost per page.
+    page_size = 50
+
+class StockMovementViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = StockMovementSerializer
+    pagination_class = StockMovementPagination
+    last_modified_field = 'date' # The ledger is append-only
 
     def get_queryset(self):
         user = self.request.user
         if user.shop:
-            return StockMovement.objects.filter(product__shop=user.shop)
+            return StockMovement.objects.filter(shop=user.shop).select_related('product')
         return StockMovement.objects.none()
+
+    def _date_param(self, name):
+        try:
+            return parse_date(self.request.query_params.get(name) or '')
+        except ValueError:
+            return None
+
+    def _product_ids(self):
+        product = self.request.query_params.get('product')
+        return [int(product)] if product and product.isdigit() else None
+
+    @action(detail=False, methods=['get'])
+    def at(self, request):
+        """
+        Stock de chaque produit en fin de journée ``?date=YYYY-MM-DD`` (local),
+        valued at the current purchase price. ``?product=<id>`` restricts it.
+        """
+        shop = request.user.shop
+        day = self._date_param('date') if shop else None
+        if not day:
+            return Response({'error': 'Paramètre date (AAAA-MM-JJ) requis.'}, status=400)
+
+        balances = stock_at(shop, end_of_day(day), self._product_ids())
+        products = Product.objects.filter(shop=shop, id__in=balances).values_list('id', 'name', 'purchase_price')
+        rows = []
+        for pk, name, purchase_price in products.order_by('name'):
+            quantity = balances[pk]
+            rows.append({'product': pk, 'name': name, 'quantity': quantity, 'value': float(quantity * purchase_price)})
+        return Response({
+            'date': day,
+            'products': rows,
+            'total_quantity': sum(r['quantity'] for r in rows),
+            'total_value': sum(r['value'] for r in rows),
+        })
+
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """Stock en fin de journée de ``?start=`` à ``?end=`` (366 jours au plus)."""
+        shop = request.user.shop
+        start = self._date_param('start')
+        end = self._date_param('end') or timezone.localdate()
+        if not shop or not start or start > end or (end - start).days > 366:
+            return Response({'error': 'Période invalide (start/end AAAA-MM-JJ, 366 jours au plus).'}, status=400)
+
+        points = stock_series(shop, start, end, self._product_ids())
+        return Response([
+            {'date': day, 'quantity': sum(balances.values()), 'products': balances}
+            for day, balances in points
+        ])
@@ -1,8 +1,26 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from .models import Product, Category
+from .services import record_adjustment
+from .bulk import COLUMN_ALIASES, ImportAborted, import_products, read_rows
+from core.plans import plan_required
 from .serializers import ProductSerializer # Or use a Django Form
 from django.http import HttpResponseForbidden
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import Q
+
+def _clean_barcode(value):
+    value = (value or '').strip()
+    return value or None
+
+def _barcode_taken(shop, barcode, exclude_pk=None):
+    if not barcode:
+        return False
+    qs = Product.objects.filter(shop=shop, barcode=barcode)
+    if exclude_pk:
+        qs = qs.exclude(pk=exclude_pk)
+    return qs.exists()
 
 @login_required
 def product_list(request):
@@ -12,7 +30,7 @@ def product_list(request):
     # Search
     query = request.GET.get('q')
     if query:
-        products = products.filter(name__icontains=query)
+        products = products.filter(Q(name__icontains=query) | Q(barcode=query))
 
     # Category Filter
     category_id = request.GET.get('category')
@@ -39,11 +57,17 @@ def product_add(request):
         purchase_price = request.POST.get('purchase_price') or 0
         qty = request.POST.get('quantity') or 0
         category_id = request.POST.get('category')
+        barcode = _clean_barcode(request.POST.get('barcode'))
         
         # ... validation ...
         
         # Check limit
         shop = request.user.shop
+
+        if _barcode_taken(shop, barcode):
+            messages.error(request, f"Le code-barres {barcode} est déjà utilisé par un autre produit.")
+            categories = Category.objects.filter(shop=shop) if shop.is_pro else []
+            return render(request, 'inventory/product_form.html', {'categories': categories})
         if shop.products.count() >= shop.product_limit:
              # handle error
              pass
@@ -60,15 +84,18 @@ def product_add(request):
 
         # package_price column exists in DB and is required in some migrations/instances;
         # set to 0 by default to avoid NOT NULL errors.
-        Product.objects.create(
-            shop=shop,
-            name=name,
-            selling_price=price,
-            purchase_price=purchase_price,
-            package_price=0,
-            quantity=qty_val,
-            category=category
-        )
+        with transaction.atomic():
+            product = Product.objects.create(
+                shop=shop,
+                name=name,
+                barcode=barcode,
+                selling_price=price,
+                purchase_price=purchase_price,
+                package_price=0,
+                quantity=qty_val,
+                category=category
+            )
+            record_adjustment(product, qty_val, "Stock initial")
         # Redirect to the exact inventory products route so offline SW has the cached URL
         return redirect('/inventory/products/')
     
@@ -93,6 +120,11 @@ def product_edit(request, pk):
         purchase_price = request.POST.get('purchase_price') or product.purchase_price
         qty = request.POST.get('quantity') or product.quantity
         category_id = request.POST.get('category')
+        barcode = _clean_barcode(request.POST.get('barcode'))
+
+        if _barcode_taken(shop, barcode, exclude_pk=product.pk):
+            messages.error(request, f"Le code-barres {barcode} est déjà utilisé par un autre produit.")
+            return redirect('product_edit', pk=product.pk)
 
         try:
             qty_val = int(qty)
@@ -103,12 +135,16 @@ def product_edit(request, pk):
         if shop.is_pro and category_id:
             category = Category.objects.filter(id=category_id, shop=shop).first()
 
+        delta = qty_val - product.quantity
         product.name = name
+        product.barcode = barcode
         product.selling_price = price
         product.purchase_price = purchase_price
         product.quantity = qty_val
         product.category = category
-        product.save()
+        with transaction.atomic():
+            product.save()
+            record_adjustment(product, delta, "Ajustement manuel")
         return redirect('/inventory/products/')
 
     categories = Category.objects.filter(shop=shop) if shop.is_pro else []
@@ -125,23 +161,37 @@ def product_delete(request, pk):
     return HttpResponseForbidden()
 
 @login_required
+@plan_required('is_pro')
 def category_list(request):
     shop = request.user.shop
-    if not shop.is_pro:
-         return render(request, 'finance/upgrade.html') # Reusing generic upgrade page for now
-    
     categories = Category.objects.filter(shop=shop)
     return render(request, 'inventory/category_list.html', {'categories': categories})
 
 @login_required
+@plan_required('is_pro')
 def category_add(request):
     shop = request.user.shop
-    if not shop.is_pro:
-         return render(request, 'finance/upgrade.html')
-
     if request.method == "POST":
         name = request.POST.get('name')
         Category.objects.create(shop=shop, name=name)
         return redirect('category_list')
         
     return render(request, 'inventory/category_form.html')
+
+@login_required
+def product_import(request):
+    """Import CSV / Excel: crée ou met à jour les produits par code (SKU) ou par nom."""
+    if request.user.role not in ['ADMIN', 'MANAGER']:
+        return HttpResponseForbidden("Accès refusé")
+    report = None
+    if request.method == 'POST' and request.FILES.get('file'):
+        try:
+            report = import_products(request.user.shop, read_rows(request.FILES['file'])).as_dict()
+        except ImportAborted as e:
+            report = e.report.as_dict()
+            messages.error(request, str(e))
+        except (ValueError, UnicodeDecodeError) as e:
+            messages.error(request, str(e))
+        else:
+            messages.success(request, f"{report['created']} produit(s) créé(s), {report['updated']} mis à jour.")
+    return render(request, 'inventory/product_import.html', {'report': report, 'columns': COLUMN_ALIASES})
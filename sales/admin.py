@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Sale, SaleItem, Payment, Invoice
+from .models import Sale, SaleItem, Payment, Invoice, InvoicePdfJob
 
 class SaleItemInline(admin.TabularInline):
     model = SaleItem
@@ -15,8 +15,8 @@ class SaleAdmin(admin.ModelAdmin):
 
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
-    list_display = ('number', 'sale', 'created_at', 'has_pdf')
-    list_filter = ('created_at',)
+    list_display = ('number', 'sale', 'created_at', 'has_pdf', 'pdf_status')
+    list_filter = ('created_at', 'pdf_status')
     
     def has_pdf(self, obj):
         return bool(obj.pdf_file)
@@ -26,3 +26,7 @@ class InvoiceAdmin(admin.ModelAdmin):
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('sale', 'method', 'amount')
     list_filter = ('method',)
+
+@admin.register(InvoicePdfJob)
+class InvoicePdfJobAdmin(admin.ModelAdmin):
+    list_display = ('invoice', 'version', 'requested_at', 'available_at', 'locked_at', 'attempts')
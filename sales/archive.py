@@ -0,0 +1,118 @@
+"""
+Archiving of old ActionLog rows.
+
+Rows older than the shop's retention (``ACTION_LOG_RETENTION_DAYS``, per
+plan) are moved, in chunks, to one gzip JSON-lines file per shop and local
+month under ``ACTION_LOG_ARCHIVE_DIR``. Each chunk is appended as a new gzip
+member and flushed to disk before its rows are deleted; should a run stop
+between the two steps, the rows are archived again and ``read_month``
+drops the duplicates by id.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from core.models import Shop
+from .models import ActionLog
+
+DEFAULT_RETENTION_DAYS = {
+    Shop.Plan.FREE: 90,
+    Shop.Plan.MEDIUM: 180,
+    Shop.Plan.PRO: 365,
+    Shop.Plan.PRO_PLUS: 730,
+}
+
+FIELDS = ['id', 'user_id', 'username', 'action', 'object_type', 'object_id', 'description', 'created_at']
+
+MONTH_RE = re.compile(r'^\d{4}-\d{2}$')
+
+
+def archive_root():
+    return str(getattr(settings, 'ACTION_LOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archives', 'action_logs')))
+
+
+def retention_days(shop):
+    policy = getattr(settings, 'ACTION_LOG_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return policy.get(shop.plan, DEFAULT_RETENTION_DAYS.get(shop.plan, 90))
+
+
+def month_path(shop_id, month):
+    return os.path.join(archive_root(), str(shop_id), f'{month}.jsonl.gz')
+
+
+def archive_shop(shop, chunk_size=1000, now=None, dry_run=False):
+    """Move the expired action logs of ``shop`` to its archive files.
+
+    Returns the number of rows archived (or that would be, with ``dry_run``).
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days(shop))
+    expired = ActionLog.objects.filter(shop=shop, created_at__lt=cutoff)
+    if dry_run:
+        return expired.count()
+
+    moved = 0
+    while True:
+        rows = list(
+            expired.order_by('created_at', 'id')
+            .values('id', 'user_id', 'action', 'object_type', 'object_id', 'description', 'created_at',
+                    username=F('user__username'))[:chunk_size]
+        )
+        if not rows:
+            return moved
+        by_month = {}
+        for row in rows:
+            month = timezone.localtime(row['created_at']).strftime('%Y-%m')
+            row['created_at'] = row['created_at'].isoformat()
+            by_month.setdefault(month, []).append(row)
+        for month, month_rows in by_month.items():
+            _append(month_path(shop.pk, month), month_rows)
+        ActionLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+
+
+def _append(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='ab') as f:
+            for row in rows:
+                f.write(json.dumps({k: row[k] for k in FIELDS}, ensure_ascii=False).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archived_months(shop):
+    """Archived months of ``shop`` ('YYYY-MM'), newest first."""
+    try:
+        names = os.listdir(os.path.join(archive_root(), str(shop.pk)))
+    except FileNotFoundError:
+        return []
+    months = [name[:-len('.jsonl.gz')] for name in names if name.endswith('.jsonl.gz')]
+    return sorted((m for m in months if MONTH_RE.match(m)), reverse=True)
+
+
+def read_month(shop, month):
+    """Unsaved ActionLog instances of an archived month, newest first."""
+    if not MONTH_RE.match(month or ''):
+        return []
+    path = month_path(shop.pk, month)
+    if not os.path.exists(path):
+        return []
+    logs = {}
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                username = row.pop('username')
+                row['created_at'] = parse_datetime(row['created_at'])
+                log = ActionLog(shop_id=shop.pk, **row)
+                log.username = username
+                logs[log.id] = log
+    except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+        # Truncated last member (interrupted run): its rows are still in the database.
+        pass
+    return sorted(logs.values(), key=lambda log: (log.created_at, log.id), reverse=True)
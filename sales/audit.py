@@ -0,0 +1,128 @@
+"""
+Write-behind audit log.
+
+``log_action`` does not touch the database: the event is kept in a
+per-process buffer (only once the surrounding transaction commits, so
+rolled-back work leaves no trace) and written with a single ``bulk_create``
+when the buffer reaches ``AUDIT_LOG_BUFFER_SIZE`` events, when
+``AUDIT_LOG_FLUSH_INTERVAL`` seconds have passed since the oldest pending
+event, and at interpreter shutdown. The insert runs on a background
+thread, so requests never wait on it. Like the previous inline writes,
+auditing is best effort and never breaks the caller.
+"""
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from core.models import Shop, User
+from .models import ActionLog
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = getattr(settings, 'AUDIT_LOG_BUFFER_SIZE', 50)
+FLUSH_INTERVAL = getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 5.0)
+
+# Seconds to wait at shutdown for background writes already under way.
+SHUTDOWN_TIMEOUT = 30
+
+_buffer = []
+_lock = threading.Lock()
+_idle = threading.Condition(_lock)
+_in_flight = 0
+_timer = None
+
+
+def log_action(shop, action, user=None, obj=None, object_type=None, object_id=None, description=None):
+    """Record an ``ActionLog`` event without waiting for the database.
+
+    ``obj`` is a shortcut for ``object_type``/``object_id`` (class name and pk).
+    """
+    if obj is not None:
+        object_type = object_type or type(obj).__name__
+        object_id = object_id or obj.pk
+    entry = ActionLog(
+        shop_id=getattr(shop, 'pk', shop),
+        user_id=getattr(user, 'pk', user),
+        action=action,
+        object_type=object_type,
+        object_id=None if object_id is None else str(object_id),
+        description=description,
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: _push(entry))
+
+
+def _push(entry):
+    global _timer
+    with _lock:
+        _buffer.append(entry)
+        full = len(_buffer) >= BUFFER_SIZE
+        if not full and _timer is None:
+            _timer = threading.Timer(FLUSH_INTERVAL, _flush_in_background)
+            _timer.daemon = True
+            _timer.start()
+    if full:
+        threading.Thread(target=_flush_in_background, daemon=True).start()
+
+
+def flush():
+    """Write every buffered event now. Returns the number of rows written."""
+    global _timer, _in_flight
+    with _lock:
+        batch = _buffer[:]
+        _buffer.clear()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        if not batch:
+            return 0
+        _in_flight += 1
+    try:
+        try:
+            ActionLog.objects.bulk_create(batch, batch_size=500)
+        except IntegrityError:
+            # A shop or user was deleted while its events were buffered.
+            batch = _drop_dangling(batch)
+            ActionLog.objects.bulk_create(batch, batch_size=500)
+    except Exception:
+        logger.exception("Could not write %d audit log entries", len(batch))
+        return 0
+    finally:
+        with _lock:
+            _in_flight -= 1
+            _idle.notify_all()
+    return len(batch)
+
+
+def _drop_dangling(batch):
+    shops = set(Shop.objects.filter(pk__in={e.shop_id for e in batch}).values_list('pk', flat=True))
+    users = set(User.objects.filter(pk__in={e.user_id for e in batch if e.user_id}).values_list('pk', flat=True))
+    kept = []
+    for entry in batch:
+        if entry.shop_id not in shops:
+            continue
+        if entry.user_id not in users:
+            entry.user_id = None
+        kept.append(entry)
+    return kept
+
+
+def _flush_in_background():
+    try:
+        flush()
+    finally:
+        # Each background thread has its own connection.
+        connection.close()
+
+
+def _shutdown():
+    flush()
+    # Daemon threads are killed with the interpreter: let the batches they
+    # already took out of the buffer reach the database first.
+    with _lock:
+        _idle.wait_for(lambda: _in_flight == 0, timeout=SHUTDOWN_TIMEOUT)
+
+
+atexit.register(_shutdown)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Invoice, InvoicePdfJob
+from .utils import generate_invoice_pdf
+
+# A worker that died mid-render releases its jobs after this delay.
+STALE_LOCK_AFTER = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+
+
+def enqueue_invoice_pdf(invoice, new=False):
+    """Ask for the PDF of ``invoice`` to be (re)rendered by the worker.
+
+    Called inside the sale transaction, so the job only becomes visible once
+    the sale commits. Repeated calls for the same invoice coalesce into the
+    existing job row. ``new`` skips the lookup for a just-created invoice.
+    """
+    now = timezone.now()
+    if new:
+        InvoicePdfJob.objects.create(invoice=invoice, requested_at=now, available_at=now)
+        return
+
+    bump = {'version': F('version') + 1, 'requested_at': now}
+    if not InvoicePdfJob.objects.filter(invoice=invoice).update(**bump):
+        try:
+            with transaction.atomic():
+                InvoicePdfJob.objects.create(invoice=invoice, requested_at=now, available_at=now)
+        except IntegrityError:
+            InvoicePdfJob.objects.filter(invoice=invoice).update(**bump)
+
+    if invoice.pdf_status != Invoice.PdfStatus.PENDING:
+        invoice.pdf_status = Invoice.PdfStatus.PENDING
+        Invoice.objects.filter(pk=invoice.pk).update(pdf_status=Invoice.PdfStatus.PENDING)
+
+
+def _claimable(now):
+    return InvoicePdfJob.objects.filter(available_at__lte=now).filter(
+        Q(locked_at__isnull=True) | Q(locked_at__lt=now - STALE_LOCK_AFTER)
+    )
+
+
+def claim_jobs(limit=20):
+    """Lock up to ``limit`` due jobs for this worker and return their ids."""
+    now = timezone.now()
+    claimed = []
+    for pk in _claimable(now).values_list('pk', flat=True)[:limit]:
+        if _claimable(now).filter(pk=pk).update(locked_at=now):
+            claimed.append(pk)
+    return claimed
+
+
+def render_job(pk):
+    """Render one claimed job. Returns True if the PDF was written."""
+    try:
+        job = InvoicePdfJob.objects.select_related(
+            'invoice__sale__shop', 'invoice__sale__cashier'
+        ).get(pk=pk)
+    except InvoicePdfJob.DoesNotExist:
+        return False
+
+    invoice = job.invoice
+    try:
+        pdf_path = generate_invoice_pdf(invoice)
+    except Exception as e:
+        attempts = job.attempts + 1
+        Invoice.objects.filter(pk=invoice.pk).update(
+            pdf_status=Invoice.PdfStatus.FAILED, pdf_error=str(e)
+        )
+        if attempts >= MAX_ATTEMPTS:
+            job.delete()
+        else:
+            InvoicePdfJob.objects.filter(pk=pk).update(
+                attempts=attempts,
+                locked_at=None,
+                available_at=timezone.now() + timedelta(seconds=30 * 2 ** attempts),
+            )
+        return False
+
+    # Drop the job unless the invoice was requested again while rendering,
+    # in which case it stays queued for one more pass.
+    done = InvoicePdfJob.objects.filter(pk=pk, version=job.version).delete()[0]
+    fields = {'pdf_file': pdf_path, 'pdf_rendered_at': timezone.now(), 'pdf_error': None}
+    if done:
+        fields['pdf_status'] = Invoice.PdfStatus.READY
+    else:
+        InvoicePdfJob.objects.filter(pk=pk).update(locked_at=None, attempts=0)
+    Invoice.objects.filter(pk=invoice.pk).update(**fields)
+    return True
+
+
+def run_pending(limit=20):
+    """Claim and render one batch of jobs. Returns the number of jobs processed."""
+    jobs = claim_jobs(limit)
+    for pk in jobs:
+        render_job(pk)
+    return len(jobs)
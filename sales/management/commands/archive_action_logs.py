@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from core.models import Shop
+from sales import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move action logs older than the plan retention (ACTION_LOG_RETENTION_DAYS) "
+        "to gzip JSON-lines files, one per shop and month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', help="Shop id (repeatable). Default: all shops.")
+        parser.add_argument('--chunk', type=int, default=1000, help="Rows moved per batch.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows to archive.")
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('id')
+        if options['shop']:
+            shops = shops.filter(id__in=options['shop'])
+        total = 0
+        for shop in shops.iterator():
+            moved = archive.archive_shop(shop, chunk_size=options['chunk'], dry_run=options['dry_run'])
+            if moved:
+                self.stdout.write(f"{shop.name}: {moved} action(s)")
+            total += moved
+        verb = "à archiver" if options['dry_run'] else "archivée(s)"
+        self.stdout.write(self.style.SUCCESS(f"{total} action(s) {verb}."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import Shop
+from sales import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollups (DailySalesSummary, ProductDailySales) from the sales history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', help="Shop id (repeatable). Default: all shops.")
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('id')
+        if options['shop']:
+            shops = shops.filter(id__in=options['shop'])
+        count = 0
+        for shop in shops.iterator():
+            with transaction.atomic():
+                rollups.rebuild(shop)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Agrégats reconstruits pour {count} boutique(s)."))
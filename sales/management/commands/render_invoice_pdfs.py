@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from sales.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Worker that renders queued invoice PDFs (see sales.jobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+        parser.add_argument('--batch', type=int, default=20, help="Jobs claimed per pass.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                done = run_pending(options['batch'])
+                total += done
+                if done:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"{total} facture(s) traitée(s)."))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_rendered_invoices(apps, schema_editor):
+    Invoice = apps.get_model('sales', 'Invoice')
+    Invoice.objects.exclude(pdf_file__isnull=True).exclude(pdf_file='').update(pdf_status='READY')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_actionlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_rendered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_status',
+            field=models.CharField(choices=[('PENDING', 'En attente'), ('READY', 'Générée'), ('FAILED', 'Échec')], default='PENDING', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='InvoicePdfJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('requested_at', models.DateTimeField()),
+                ('available_at', models.DateTimeField()),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('invoice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_job', to='sales.invoice')),
+            ],
+            options={
+                'ordering': ['available_at'],
+            },
+        ),
+        migrations.RunPython(mark_rendered_invoices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_shop_catalog_version'),
+        ('sales', '0007_actionlog_created_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionlog',
+            index=models.Index(fields=['shop', 'created_at', 'id'], name='actionlog_shop_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_actionlog_shop_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysalessummary',
+            name='cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='productdailysales',
+            name='cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='unit_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+CHUNK_SIZE = 10000
+
+
+def backfill_unit_cost(apps, schema_editor):
+    # History has no recorded cost: use the product's current purchase price,
+    # by id ranges in short transactions.
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    Product = apps.get_model('inventory', 'Product')
+    db = schema_editor.connection.alias
+    items = SaleItem.objects.using(db)
+    last_id = items.order_by('-id').values_list('id', flat=True).first()
+    if last_id is None:
+        return
+    purchase_price = Subquery(Product.objects.using(db).filter(pk=OuterRef('product_id')).values('purchase_price')[:1])
+    for start in range(0, last_id + 1, CHUNK_SIZE):
+        with transaction.atomic(using=db):
+            items.filter(id__gte=start, id__lt=start + CHUNK_SIZE, product__isnull=False).update(unit_cost=purchase_price)
+
+
+def backfill_rollup_cost(apps, schema_editor):
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    DailySalesSummary = apps.get_model('sales', 'DailySalesSummary')
+    ProductDailySales = apps.get_model('sales', 'ProductDailySales')
+    Shop = apps.get_model('core', 'Shop')
+    db = schema_editor.connection.alias
+    line_cost = ExpressionWrapper(F('unit_cost') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+    for shop_id in Shop.objects.using(db).values_list('id', flat=True).iterator():
+        items = SaleItem.objects.using(db).filter(sale__shop_id=shop_id).annotate(day=TruncDate('sale__created_at'))
+        with transaction.atomic(using=db):
+            costs = {
+                (row['day'], row['sale__payment_method'], row['sale__cashier_id']): row['cost']
+                for row in items.values('day', 'sale__payment_method', 'sale__cashier_id').annotate(cost=Sum(line_cost)).order_by()
+            }
+            summaries = list(DailySalesSummary.objects.using(db).filter(shop_id=shop_id))
+            for row in summaries:
+                row.cost = costs.get((row.date, row.payment_method, row.cashier_id)) or 0
+            DailySalesSummary.objects.using(db).bulk_update(summaries, ['cost'], batch_size=500)
+
+            costs = {
+                (row['day'], row['product_id'], row['product_name']): row['cost']
+                for row in items.values('day', 'product_id', 'product_name').annotate(cost=Sum(line_cost)).order_by()
+            }
+            product_rows = list(ProductDailySales.objects.using(db).filter(shop_id=shop_id))
+            for row in product_rows:
+                row.cost = costs.get((row.date, row.product_id, row.product_name)) or 0
+            ProductDailySales.objects.using(db).bulk_update(product_rows, ['cost'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('sales', '0009_sale_cost'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_unit_cost, migrations.RunPython.noop),
+        migrations.RunPython(backfill_rollup_cost, migrations.RunPython.noop),
+    ]
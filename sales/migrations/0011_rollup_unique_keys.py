@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicates(apps, schema_editor):
+    # Fold rows sharing a key into the oldest one before the constraints exist.
+    db = schema_editor.connection.alias
+    rollups = [
+        (apps.get_model('sales', 'DailySalesSummary'), ['shop_id', 'date', 'payment_method', 'cashier_id'], ['sale_count', 'revenue', 'cost']),
+        (apps.get_model('sales', 'ProductDailySales'), ['shop_id', 'date', 'product_id', 'product_name'], ['quantity', 'revenue', 'cost']),
+    ]
+    for model, key, totals in rollups:
+        groups = (
+            # NULL keys never collide.
+            model.objects.using(db).filter(**{f'{field}__isnull': False for field in key})
+            .values(*key).annotate(n=Count('id')).filter(n__gt=1).order_by()
+        )
+        for group in groups:
+            rows = list(model.objects.using(db).filter(**{field: group[field] for field in key}).order_by('id'))
+            kept = rows[0]
+            for row in rows[1:]:
+                for field in totals:
+                    setattr(kept, field, getattr(kept, field) + getattr(row, field))
+            kept.save(update_fields=totals)
+            model.objects.using(db).filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_shop_catalog_version'),
+        ('inventory', '0012_seed_stock_valuation'),
+        ('sales', '0010_backfill_sale_cost'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailysalessummary',
+            constraint=models.UniqueConstraint(fields=('shop', 'date', 'payment_method', 'cashier'), name='unique_daily_sales_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='productdailysales',
+            constraint=models.UniqueConstraint(fields=('shop', 'date', 'product', 'product_name'), name='unique_product_sales_key'),
+        ),
+    ]
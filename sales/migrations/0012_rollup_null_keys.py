@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:12
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_null_keys(apps, schema_editor):
+    # Rows left by deleted cashiers / products share a NULL key: keep one.
+    db = schema_editor.connection.alias
+    rollups = [
+        (apps.get_model('sales', 'DailySalesSummary'), ['shop_id', 'date', 'payment_method'], 'cashier', ['sale_count', 'revenue', 'cost']),
+        (apps.get_model('sales', 'ProductDailySales'), ['shop_id', 'date', 'product_name'], 'product', ['quantity', 'revenue', 'cost']),
+    ]
+    for model, key, nullable, totals in rollups:
+        orphans = model.objects.using(db).filter(**{f'{nullable}__isnull': True})
+        for group in orphans.values(*key).annotate(n=Count('id')).filter(n__gt=1).order_by():
+            rows = list(orphans.filter(**{field: group[field] for field in key}).order_by('id'))
+            kept = rows[0]
+            for row in rows[1:]:
+                for field in totals:
+                    setattr(kept, field, getattr(kept, field) + getattr(row, field))
+            kept.save(update_fields=totals)
+            model.objects.using(db).filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_shop_catalog_version'),
+        ('inventory', '0012_seed_stock_valuation'),
+        ('sales', '0011_rollup_unique_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_null_keys, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='dailysalessummary',
+            name='unique_daily_sales_key',
+        ),
+        migrations.RemoveConstraint(
+            model_name='productdailysales',
+            name='unique_product_sales_key',
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalessummary',
+            constraint=models.UniqueConstraint(models.F('shop'), models.F('date'), models.F('payment_method'), django.db.models.functions.comparison.Coalesce('cashier', models.Value(0), output_field=models.BigIntegerField()), name='unique_daily_sales_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='productdailysales',
+            constraint=models.UniqueConstraint(models.F('shop'), models.F('date'), django.db.models.functions.comparison.Coalesce('product', models.Value(0), output_field=models.BigIntegerField()), models.F('product_name'), name='unique_product_sales_key'),
+        ),
+    ]
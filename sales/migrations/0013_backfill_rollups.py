@@ -0,0 +1,70 @@
+from django.db import migrations, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    # Sales recorded before the rollups existed: rebuild every shop's rows
+    # (with costs, now that SaleItem.unit_cost is filled), one shop per
+    # transaction. Same computation as sales.rollups.rebuild.
+    Shop = apps.get_model('core', 'Shop')
+    Sale = apps.get_model('sales', 'Sale')
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    DailySalesSummary = apps.get_model('sales', 'DailySalesSummary')
+    ProductDailySales = apps.get_model('sales', 'ProductDailySales')
+    db = schema_editor.connection.alias
+    line_cost = ExpressionWrapper(F('unit_cost') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+    for shop_id in Shop.objects.using(db).filter(sales__isnull=False).distinct().values_list('id', flat=True).iterator():
+        items = SaleItem.objects.using(db).filter(sale__shop_id=shop_id).annotate(day=TruncDate('sale__created_at'))
+        with transaction.atomic(using=db):
+            DailySalesSummary.objects.using(db).filter(shop_id=shop_id).delete()
+            ProductDailySales.objects.using(db).filter(shop_id=shop_id).delete()
+
+            costs = {
+                (row['day'], row['sale__payment_method'], row['sale__cashier_id']): row['cost']
+                for row in items.values('day', 'sale__payment_method', 'sale__cashier_id').annotate(cost=Sum(line_cost)).order_by()
+            }
+            summaries = (
+                Sale.objects.using(db).filter(shop_id=shop_id).annotate(day=TruncDate('created_at'))
+                .values('day', 'payment_method', 'cashier_id')
+                .annotate(sale_count=Count('id'), revenue=Sum('total_amount')).order_by()
+            )
+            DailySalesSummary.objects.using(db).bulk_create(
+                (
+                    DailySalesSummary(
+                        shop_id=shop_id, date=row['day'], payment_method=row['payment_method'],
+                        cashier_id=row['cashier_id'], sale_count=row['sale_count'], revenue=row['revenue'] or 0,
+                        cost=costs.get((row['day'], row['payment_method'], row['cashier_id'])) or 0,
+                    )
+                    for row in summaries.iterator()
+                ),
+                batch_size=500,
+            )
+
+            products = (
+                items.values('day', 'product_id', 'product_name')
+                .annotate(cost=Sum(line_cost), quantity=Sum('quantity'), revenue=Sum('subtotal')).order_by()
+            )
+            ProductDailySales.objects.using(db).bulk_create(
+                (
+                    ProductDailySales(
+                        shop_id=shop_id, date=row['day'], product_id=row['product_id'], product_name=row['product_name'],
+                        quantity=row['quantity'] or 0, revenue=row['revenue'] or 0, cost=row['cost'] or 0,
+                    )
+                    for row in products.iterator()
+                ),
+                batch_size=500,
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('sales', '0012_rollup_null_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from core.models import Shop, User
 from inventory.models import Product
 from django.utils.translation import gettext_lazy as _
@@ -16,6 +19,12 @@ class Sale(models.Model):
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     payment_method = models.CharField(max_length=10, choices=PaymentMethod.choices, default=PaymentMethod.CASH)
 
+    class Meta:
+        indexes = [
+            # Date-range filters and keyset pagination of the shop's history
+            models.Index(fields=['shop', 'created_at', 'id'], name='sale_shop_created_idx'),
+        ]
+
     def __str__(self):
         return f"Sale #{self.id} - {self.total_amount}"
 
@@ -25,10 +34,14 @@ class SaleItem(models.Model):
     product_name = models.CharField(max_length=200) # Snapshot in case product is deleted/renamed
     quantity = models.IntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2) # Price at the moment of sale
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0) # Purchase cost at the moment of sale
     subtotal = models.DecimalField(max_digits=12, decimal_places=2)
 
     def save(self, *args, **kwargs):
         self.subtotal = self.quantity * self.price
+        if self._state.adding and not self.unit_cost and self.product_id:
+            from inventory.valuation import average_costs
+            self.unit_cost = average_costs([self.product])[self.product_id]
         # Update product stock on save? Or separate service? 
         # Better to do it in a service/view to handle atomicity and validation.
         super().save(*args, **kwargs)
@@ -45,12 +58,97 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 class Invoice(models.Model):
+    class PdfStatus(models.TextChoices):
+        PENDING = 'PENDING', _('En attente')
+        READY = 'READY', _('Générée')
+        FAILED = 'FAILED', _('Échec')
+
     sale = models.OneToOneField(Sale, on_delete=models.CASCADE, related_name='invoice')
     number = models.CharField(max_length=50, unique=True)
     pdf_file = models.FileField(upload_to='invoices/', blank=True, null=True)
+    pdf_status = models.CharField(max_length=10, choices=PdfStatus.choices, default=PdfStatus.PENDING)
+    pdf_rendered_at = models.DateTimeField(null=True, blank=True)
+    pdf_error = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+class InvoicePdfJob(models.Model):
+    """
+    File d'attente locale des rendus PDF.
+    One row per invoice: repeated requests only bump ``version``, so a burst of
+    changes on the same sale collapses into a single render by the worker.
+    """
+    invoice = models.OneToOneField(Invoice, on_delete=models.CASCADE, related_name='pdf_job')
+    version = models.PositiveIntegerField(default=1)
+    requested_at = models.DateTimeField()
+    available_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['available_at']
+
+    def __str__(self):
+        return f"PDF job for invoice {self.invoice_id} (v{self.version})"
+
+
+class DailySalesSummary(models.Model):
+    """
+    Agrégat journalier des ventes par (boutique, date locale, mode de paiement, caissier).
+    Maintained incrementally by sales.rollups; rebuild with manage.py rebuild_sales_rollups.
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    payment_method = models.CharField(max_length=10, choices=Sale.PaymentMethod.choices)
+    cashier = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    sale_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0) # Cost of goods sold
+
+    class Meta:
+        constraints = [
+            # Coalesce: rows whose cashier was deleted share one key (see rollups.detach_cashier).
+            models.UniqueConstraint(
+                F('shop'), F('date'), F('payment_method'), Coalesce('cashier', Value(0), output_field=models.BigIntegerField()),
+                name='unique_daily_sales_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'date'], name='daily_sales_shop_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.shop_id} {self.date} {self.payment_method}: {self.revenue}"
+
+
+class ProductDailySales(models.Model):
+    """
+    Agrégat journalier des quantités et du chiffre d'affaires par produit.
+    Keyed on the product name snapshot, like the SaleItem lines it sums.
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='product_daily_sales')
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    product_name = models.CharField(max_length=200)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                F('shop'), F('date'), Coalesce('product', Value(0), output_field=models.BigIntegerField()), F('product_name'),
+                name='unique_product_sales_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'date'], name='product_sales_shop_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.shop_id} {self.date} {self.product_name}: {self.quantity}"
+
+
 class ActionLog(models.Model):
     class ActionChoices(models.TextChoices):
         SALE_CREATED = 'SALE_CREATED', 'Sale created'
@@ -65,10 +163,14 @@ class ActionLog(models.Model):
     object_type = models.CharField(max_length=100, blank=True, null=True)
     object_id = models.CharField(max_length=100, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the caller: buffered entries keep the time of the event (see sales.audit).
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['shop', 'created_at', 'id'], name='actionlog_shop_created_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.created_at}] {self.get_action_display()} ({self.object_type}#{self.object_id})"
@@ -0,0 +1,97 @@
+"""
+Keyset (seek) pagination for the web lists.
+
+Pages are addressed by the (datetime, id) of their boundary rows instead of
+an OFFSET, so page 500 costs the same index range scan as page 1 and no
+``COUNT(*)`` is needed. Cursors are opaque url-safe strings.
+"""
+import base64
+from operator import attrgetter
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(moment, pk):
+    raw = f"{moment.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """Return (datetime, id) or None for a missing or malformed cursor."""
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        moment, pk = raw.rsplit('|', 1)
+        moment = parse_datetime(moment)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if moment is None:
+        return None
+    return moment, pk
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_keyset(queryset, after=None, before=None, per_page=20, keys=('created_at', 'id')):
+    """Return a ``KeysetPage`` of ``queryset``, newest first.
+
+    ``keys`` names the (datetime, unique id) pair the list is ordered by;
+    it should be covered by an index. ``after`` / ``before`` are cursors
+    taken from a previous page.
+    """
+    moment_key, pk_key = keys
+    read_key = lambda name: attrgetter(name.replace('__', '.'))
+    read_moment, read_pk = read_key(moment_key), read_key(pk_key)
+
+    def cursor_of(obj):
+        return encode_cursor(read_moment(obj), read_pk(obj))
+
+    before = decode_cursor(before)
+    after = decode_cursor(after)
+
+    if before:
+        moment, pk = before
+        rows = list(
+            queryset.filter(Q(**{f'{moment_key}__gt': moment}) | Q(**{moment_key: moment, f'{pk_key}__gt': pk}))
+            .order_by(moment_key, pk_key)[:per_page + 1]
+        )
+        more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        if not rows:
+            return KeysetPage([])
+        return KeysetPage(rows, next_cursor=cursor_of(rows[-1]), previous_cursor=cursor_of(rows[0]) if more else None)
+
+    if after:
+        moment, pk = after
+        queryset = queryset.filter(Q(**{f'{moment_key}__lt': moment}) | Q(**{moment_key: moment, f'{pk_key}__lt': pk}))
+    rows = list(queryset.order_by(f'-{moment_key}', f'-{pk_key}')[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not rows:
+        return KeysetPage([])
+    return KeysetPage(
+        rows,
+        next_cursor=cursor_of(rows[-1]) if more else None,
+        previous_cursor=cursor_of(rows[0]) if after else None,
+    )
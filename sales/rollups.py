@@ -0,0 +1,199 @@
+"""
+Incremental maintenance of the daily sales rollups (DailySalesSummary and
+ProductDailySales).
+
+``record_sale`` is called by ``commit_sale`` in the sale transaction and
+``forget_sale`` when a sale is deleted, so the statistics pages can read a
+few rollup rows instead of scanning the whole sales history. Dates are local
+dates in the project time zone. ``rebuild`` recomputes everything from the
+sales tables.
+
+The cashier and product of a row are SET_NULL when the user or product is
+deleted; ``detach_cashier`` / ``detach_product`` first fold its rows into
+the matching NULL-keyed rows, so a key always designates a single row
+(the unique constraints treat NULL as a value).
+
+Both also drop the cached statistics of the shop once the transaction
+commits (see ``finance.views_stats``).
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Sale, SaleItem, DailySalesSummary, ProductDailySales
+
+LINE_COST = ExpressionWrapper(F('unit_cost') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+STATS_CACHE_TIMEOUT = getattr(settings, 'STATISTICS_CACHE_TIMEOUT', 300)
+
+
+def stats_cache_key(shop_id):
+    return f'sales-stats:{shop_id}'
+
+
+def invalidate_stats(shop_id):
+    """Drop the cached statistics of a shop after the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(stats_cache_key(shop_id)))
+
+
+def _bump_summary(sale, day, cost, sign):
+    key = dict(shop_id=sale.shop_id, date=day, payment_method=sale.payment_method, cashier_id=sale.cashier_id)
+    revenue = sign * Decimal(sale.total_amount)
+    cost = sign * Decimal(cost)
+    updated = DailySalesSummary.objects.filter(**key).update(
+        sale_count=F('sale_count') + sign, revenue=F('revenue') + revenue, cost=F('cost') + cost
+    )
+    if not updated and sign > 0:
+        try:
+            with transaction.atomic():
+                DailySalesSummary.objects.create(sale_count=1, revenue=revenue, cost=cost, **key)
+        except IntegrityError:
+            # Created by a concurrent sale since the update.
+            _bump_summary(sale, day, cost, sign)
+
+
+def _bump_products(shop_id, day, lines, sign):
+    """``lines`` is a list of (product_id, product_name, quantity, subtotal, cost)."""
+    totals = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+    for product_id, product_name, quantity, subtotal, cost in lines:
+        row = totals[(product_id, product_name)]
+        row[0] += sign * quantity
+        row[1] += sign * Decimal(subtotal)
+        row[2] += sign * Decimal(cost)
+    if not totals:
+        return
+
+    existing = ProductDailySales.objects.select_for_update().filter(
+        shop_id=shop_id, date=day, product_name__in={name for _pk, name in totals}
+    )
+    to_update = []
+    for row in existing:
+        delta = totals.pop((row.product_id, row.product_name), None)
+        if delta is None:
+            continue
+        row.quantity += delta[0]
+        row.revenue += delta[1]
+        row.cost += delta[2]
+        to_update.append(row)
+    if to_update:
+        ProductDailySales.objects.bulk_update(to_update, ['quantity', 'revenue', 'cost'])
+
+    if sign > 0 and totals:
+        try:
+            with transaction.atomic():
+                ProductDailySales.objects.bulk_create([
+                    ProductDailySales(
+                        shop_id=shop_id, date=day, product_id=product_id, product_name=product_name,
+                        quantity=quantity, revenue=revenue, cost=cost,
+                    )
+                    for (product_id, product_name), (quantity, revenue, cost) in totals.items()
+                ])
+        except IntegrityError:
+            # Some rows were created by a concurrent sale since the lookup.
+            _bump_products(shop_id, day, [key + tuple(values) for key, values in totals.items()], 1)
+
+
+def record_sale(sale, lines):
+    """Add a freshly committed sale to the rollups.
+
+    ``lines`` is a list of (product_id, product_name, quantity, subtotal, cost).
+    """
+    day = timezone.localdate(sale.created_at)
+    _bump_summary(sale, day, sum(line[4] for line in lines), 1)
+    _bump_products(sale.shop_id, day, lines, 1)
+    invalidate_stats(sale.shop_id)
+
+
+def forget_sale(sale):
+    """Remove a sale (about to be deleted) from the rollups."""
+    day = timezone.localdate(sale.created_at)
+    lines = list(sale.items.values_list('product_id', 'product_name', 'quantity', 'subtotal', LINE_COST))
+    _bump_summary(sale, day, sum(line[4] for line in lines), -1)
+    _bump_products(sale.shop_id, day, lines, -1)
+    invalidate_stats(sale.shop_id)
+
+
+def _fold(rows, lookup, totals):
+    """Add each of ``rows`` to the row matching ``lookup(row)`` with a NULL key, if any, and delete it."""
+    for row in rows:
+        target = type(row).objects.select_for_update().filter(**lookup(row)).first()
+        if target is None:
+            continue # Becomes the NULL-keyed row.
+        for field in totals:
+            setattr(target, field, getattr(target, field) + getattr(row, field))
+        target.save(update_fields=totals)
+        row.delete()
+
+
+def detach_cashier(user_id):
+    """Merge the rollup rows of a cashier about to be deleted into the rows without cashier."""
+    _fold(
+        DailySalesSummary.objects.select_for_update().filter(cashier_id=user_id),
+        lambda row: dict(shop_id=row.shop_id, date=row.date, payment_method=row.payment_method, cashier__isnull=True),
+        ['sale_count', 'revenue', 'cost'],
+    )
+
+
+def detach_product(product_id):
+    """Merge the rollup rows of a product about to be deleted into the rows without product."""
+    _fold(
+        ProductDailySales.objects.select_for_update().filter(product_id=product_id),
+        lambda row: dict(shop_id=row.shop_id, date=row.date, product_name=row.product_name, product__isnull=True),
+        ['quantity', 'revenue', 'cost'],
+    )
+
+
+def rebuild(shop):
+    """Recompute all rollup rows of ``shop`` from its sales."""
+    DailySalesSummary.objects.filter(shop=shop).delete()
+    ProductDailySales.objects.filter(shop=shop).delete()
+
+    summaries = (
+        Sale.objects.filter(shop=shop)
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'payment_method', 'cashier_id')
+        .annotate(sale_count=Count('id'), revenue=Sum('total_amount'))
+        .order_by()
+    )
+    costs = dict(
+        ((row['day'], row['payment_method'], row['cashier_id']), row['cost'])
+        for row in SaleItem.objects.filter(sale__shop=shop)
+        .annotate(day=TruncDate('sale__created_at'), payment_method=F('sale__payment_method'), cashier_id=F('sale__cashier_id'))
+        .values('day', 'payment_method', 'cashier_id')
+        .annotate(cost=Sum(LINE_COST))
+        .order_by()
+    )
+    DailySalesSummary.objects.bulk_create(
+        (
+            DailySalesSummary(
+                shop=shop, date=row['day'], payment_method=row['payment_method'],
+                cashier_id=row['cashier_id'], sale_count=row['sale_count'], revenue=row['revenue'] or 0,
+                cost=costs.get((row['day'], row['payment_method'], row['cashier_id'])) or 0,
+            )
+            for row in summaries.iterator()
+        ),
+        batch_size=500,
+    )
+
+    products = (
+        SaleItem.objects.filter(sale__shop=shop)
+        .annotate(day=TruncDate('sale__created_at'))
+        .values('day', 'product_id', 'product_name')
+        .annotate(cost=Sum(LINE_COST), quantity=Sum('quantity'), revenue=Sum('subtotal'))
+        .order_by()
+    )
+    ProductDailySales.objects.bulk_create(
+        (
+            ProductDailySales(
+                shop=shop, date=row['day'], product_id=row['product_id'], product_name=row['product_name'],
+                quantity=row['quantity'] or 0, revenue=row['revenue'] or 0, cost=row['cost'] or 0,
+            )
+            for row in products.iterator()
+        ),
+        batch_size=500,
+    )
+    invalidate_stats(shop.pk)
@@ -1,15 +1,64 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Sale, SaleItem, Payment, Invoice
 from inventory.models import Product
+from inventory.services import InsufficientStock
+from .services import commit_sale, resolve_products
+
+
+def _request_shop(context):
+    request = context.get('request')
+    user = getattr(request, 'user', None)
+    return getattr(user, 'shop', None) if user and user.is_authenticated else None
+
+
+class BasketProductField(serializers.PrimaryKeyRelatedField):
+    """Product of a basket line, taken from ``context['products']`` when the
+    whole basket was resolved up front (see SaleItemListSerializer)."""
+
+    def get_queryset(self):
+        shop = _request_shop(self.context)
+        return Product.objects.filter(shop=shop) if shop else Product.objects.none()
+
+    def to_internal_value(self, data):
+        products = self.context.get('products')
+        if products is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            product = products.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
+
+
+class SaleItemListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        # One shop-scoped query for every product of the basket.
+        if isinstance(data, list):
+            product_ids = set()
+            for item in data:
+                try:
+                    product_ids.add(int(item.get('product')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            shop = _request_shop(self.context)
+            self.context['products'] = resolve_products(shop, product_ids) if shop else {}
+        return super().to_internal_value(data)
+
 
 class SaleItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(required=False, allow_null=True, allow_blank=True) # Allow write for custom items
-    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), required=False, allow_null=True)
+    product = BasketProductField(queryset=Product.objects.none(), required=False, allow_null=True)
     
     class Meta:
         model = SaleItem
         fields = ['id', 'product', 'product_name', 'quantity', 'price', 'subtotal']
         read_only_fields = ['subtotal'] # product_name is now writable
+        list_serializer_class = SaleItemListSerializer
 
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,80 +70,83 @@ class InvoiceSerializer(serializers.ModelSerializer):
         model = Invoice
         fields = '__all__'
 
+def selected_fields(request, fields, expandable):
+    """Fields asked for with ``?fields=a,b`` and ``?expand=x,y``, or None for all.
+
+    Nested ``expandable`` fields are only included when listed in either
+    parameter; plain fields default to all of them when ``fields`` is absent.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    wanted = {f for f in request.query_params.get('fields', '').split(',') if f}
+    expand = {f for f in request.query_params.get('expand', '').split(',') if f}
+    if not wanted and not expand:
+        return None
+    if not wanted:
+        wanted = {f for f in fields if f not in expandable}
+    wanted |= expand & set(expandable)
+    return [f for f in fields if f in wanted]
+
+
 class SaleSerializer(serializers.ModelSerializer):
     items = SaleItemSerializer(many=True)
     payments = PaymentSerializer(many=True, read_only=True)
     invoice = InvoiceSerializer(read_only=True)
     cashier_name = serializers.ReadOnlyField(source='cashier.username')
 
+    EXPANDABLE = ('items', 'payments', 'invoice')
+
     class Meta:
         model = Sale
         fields = ['id', 'shop', 'cashier', 'cashier_name', 'created_at', 'total_amount', 'payment_method', 'items', 'payments', 'invoice']
         read_only_fields = ['total_amount', 'cashier', 'shop']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = selected_fields(self.context.get('request'), self.Meta.fields, self.EXPANDABLE)
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """Load the relations rendered for ``fields`` (all by default) in a fixed number of queries."""
+        fields = cls.Meta.fields if fields is None else fields
+        if 'cashier_name' in fields:
+            queryset = queryset.select_related('cashier')
+        if 'invoice' in fields:
+            queryset = queryset.select_related('invoice')
+        if 'items' in fields:
+            queryset = queryset.prefetch_related(Prefetch('items', queryset=SaleItem.objects.order_by('id')))
+        if 'payments' in fields:
+            queryset = queryset.prefetch_related('payments')
+        return queryset
+
     def validate(self, data):
         items_data = data.get('items')
         if not items_data:
              raise serializers.ValidationError("Aucun article dans la vente.")
              
+        # Stock Validation for existing products, against the resolved basket
+        requested = {}
         for item in items_data:
             product = item.get('product')
-            quantity = item.get('quantity')
-            
-            # Stock Validation for existing products
             if product:
-                if product.quantity < quantity:
-                    raise serializers.ValidationError(
-                        f"Stock insuffisant pour '{product.name}'. Disponible: {product.quantity}"
-                    )
+                requested[product] = requested.get(product, 0) + item.get('quantity')
+        for product, quantity in requested.items():
+            if product.quantity < quantity:
+                raise serializers.ValidationError(
+                    f"Stock insuffisant pour '{product.name}'. Disponible: {product.quantity}"
+                )
         return data
 
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        sale = Sale.objects.create(**validated_data)
-        total = 0
-        
-        for item_data in items_data:
-            product = item_data.get('product')
-            quantity = item_data['quantity']
-            # Use provided price (for custom items) or product price (if product exists)
-            price = item_data.get('price')
-            if price is None and product:
-                 price = product.selling_price
-            
-            if price is None:
-                price = 0
-
-            subtotal = price * quantity
-            
-            # Use provided name for custom items, or product name
-            custom_name = item_data.get('product_name')
-            product_name = product.name if product else (custom_name or "Vente Libre")
-            
-            item = SaleItem.objects.create(
-                sale=sale, 
-                product=product, # Can be None
-                product_name=product_name,
-                quantity=quantity, 
-                price=price, 
-                subtotal=subtotal
-            )
-            total += subtotal
-            
-            if product:
-                # Create StockMovement
-                from inventory.models import StockMovement
-                StockMovement.objects.create(
-                    product=product,
-                    quantity=quantity,
-                    movement_type=StockMovement.MovementType.OUT,
-                    reason=f"Vente #{sale.id}"
-                )
-                
-                # Decrement stock
-                product.quantity -= quantity
-                product.save()
-
-        sale.total_amount = total
-        sale.save()
-        return sale
+        shop = validated_data.pop('shop')
+        cashier = validated_data.pop('cashier', None)
+        try:
+            return commit_sale(shop, cashier, items_data, products=self.context.get('products'), **validated_data)
+        except InsufficientStock as e:
+            raise serializers.ValidationError({'non_field_errors': [str(e)], 'stock': e.failures})
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
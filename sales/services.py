@@ -0,0 +1,112 @@
+from decimal import Decimal
+from django.db import transaction
+from inventory.models import Product, StockMovement
+from inventory.services import reserve_stock
+from inventory.valuation import apply_movements
+from .audit import log_action
+from .models import ActionLog, Sale, SaleItem
+from .rollups import record_sale
+
+CENT = Decimal('0.01')
+
+
+def resolve_products(shop, product_ids):
+    """Load every product referenced by a basket in one shop-scoped query."""
+    ids = {pid for pid in product_ids if pid}
+    if not ids:
+        return {}
+    return Product.objects.filter(shop=shop, id__in=ids).in_bulk()
+
+
+def _product_id(value):
+    if value is None:
+        return None
+    return getattr(value, 'pk', value)
+
+
+@transaction.atomic
+def commit_sale(shop, cashier, items, products=None, **sale_fields):
+    """Create a sale and its lines with a constant number of queries.
+
+    ``items`` is a list of dicts with ``product`` (instance, id or None),
+    ``product_name``, ``quantity`` and optional ``price``. ``products`` may be
+    an already resolved ``{id: Product}`` map; otherwise it is loaded here.
+    Raises ``ValueError`` if a line is invalid and
+    ``inventory.services.InsufficientStock`` if stock is short.
+    """
+    if not items:
+        raise ValueError('Aucun article dans la vente.')
+
+    if products is None:
+        products = resolve_products(shop, [_product_id(it.get('product')) for it in items])
+
+    lines = []
+    quantities = {}
+    total = 0
+    for it in items:
+        product_id = _product_id(it.get('product'))
+        quantity = int(it.get('quantity') or 0)
+        price = it.get('price')
+        product = None
+        if quantity <= 0:
+            raise ValueError(f"Quantité invalide: {quantity}")
+
+        if product_id:
+            product = products.get(product_id)
+            if product is None:
+                raise ValueError(f"Produit {product_id} introuvable ou hors shop.")
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+            if price is None:
+                price = product.selling_price
+            product_name = product.name
+        else:
+            product_name = it.get('product_name') or 'Vente Libre'
+
+        if price is None:
+            price = 0
+
+        subtotal = price * quantity
+        total += subtotal
+        lines.append((product, product_name, quantity, price, subtotal))
+
+    reserve_stock(shop, quantities, products=products)
+
+    # Outgoing movements are valued at the weighted average cost, which is
+    # also the cost of goods sold recorded on the lines.
+    movements = [
+        StockMovement(product=product, shop=shop, quantity=quantity, movement_type=StockMovement.MovementType.OUT)
+        for product, _name, quantity, _price, _subtotal in lines
+        if product is not None
+    ]
+    apply_movements(shop.pk, movements, products=products)
+    costs = iter(m.unit_cost for m in movements)
+    unit_costs = [next(costs).quantize(CENT) if product is not None else 0 for product, *_rest in lines]
+
+    sale = Sale.objects.create(shop=shop, cashier=cashier, total_amount=total, **sale_fields)
+
+    SaleItem.objects.bulk_create([
+        SaleItem(
+            sale=sale,
+            product=product,
+            product_name=product_name,
+            quantity=quantity,
+            price=price,
+            subtotal=subtotal,
+            unit_cost=unit_cost,
+        )
+        for (product, product_name, quantity, price, subtotal), unit_cost in zip(lines, unit_costs)
+    ])
+
+    for movement in movements:
+        movement.reason = f"Vente #{sale.id}"
+    StockMovement.objects.bulk_create(movements)
+
+    record_sale(sale, [
+        (product.pk if product else None, product_name, quantity, subtotal, unit_cost * quantity)
+        for (product, product_name, quantity, _price, subtotal), unit_cost in zip(lines, unit_costs)
+    ])
+    log_action(
+        shop, ActionLog.ActionChoices.SALE_CREATED, user=cashier, obj=sale,
+        description=f'Sale #{sale.id} ({len(lines)} lines, {total})',
+    )
+    return sale
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
-from .models import Sale, Invoice, SaleItem
-from .utils import generate_invoice_pdf
+from .models import ActionLog, Sale, Invoice, SaleItem
+from .audit import log_action
+from .jobs import enqueue_invoice_pdf
+from core.models import User
+from inventory.models import Product
+from .rollups import detach_cashier, detach_product, forget_sale
 import uuid
 
 @receiver(post_save, sender=Sale)
@@ -15,21 +19,40 @@ def create_invoice(sender, instance, created, **kwargs):
         # Ensure uniqueness logic implies retry or better UUID usage
         
         invoice = Invoice.objects.create(sale=instance, number=number)
-        # Do not generate PDF here: SaleItems may not be created yet. PDF will be generated
-        # when SaleItems are saved (see SaleItem post_save handler below).
+        # The PDF is rendered by the worker (manage.py render_invoice_pdfs) once the
+        # sale transaction commits, so SaleItems created afterwards are included.
+        enqueue_invoice_pdf(invoice, new=True)
 
 
 @receiver(post_save, sender=SaleItem)
 def update_invoice_on_item_change(sender, instance, created, **kwargs):
-    # When a SaleItem is created/updated, generate or update the invoice PDF if invoice exists
+    # When a SaleItem is created/updated outside the sale commit (e.g. admin),
+    # queue a re-render; repeated saves coalesce into one job.
     sale = instance.sale
+    log_action(
+        sale.shop_id,
+        ActionLog.ActionChoices.ITEM_ADDED if created else ActionLog.ActionChoices.ITEM_UPDATED,
+        obj=instance,
+        description=f'{instance.product_name} x{instance.quantity} (Sale #{sale.id})',
+    )
     try:
         invoice = sale.invoice
     except Invoice.DoesNotExist:
         return
-    try:
-        pdf_path = generate_invoice_pdf(invoice)
-        invoice.pdf_file.name = pdf_path
-        invoice.save()
-    except Exception as e:
-        print(f"Error generating PDF on SaleItem save: {e}")
+    enqueue_invoice_pdf(invoice)
+
+
+@receiver(pre_delete, sender=Sale)
+def remove_sale_from_rollups(sender, instance, **kwargs):
+    # Items still exist at pre_delete, so their totals can be subtracted.
+    forget_sale(instance)
+
+
+@receiver(pre_delete, sender=User)
+def detach_cashier_rollups(sender, instance, **kwargs):
+    detach_cashier(instance.pk)
+
+
+@receiver(pre_delete, sender=Product)
+def detach_product_rollups(sender, instance, **kwargs):
+    detach_product(instance.pk)
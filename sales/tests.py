@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.test import TestCase
+from core.models import Shop, User
+from inventory.models import Product
+from sales import rollups
+from sales.models import DailySalesSummary, ProductDailySales, Sale
+from sales.pagination import decode_cursor, encode_cursor, paginate_keyset
+from sales.services import commit_sale
+
+
+class KeysetPaginationTest(TestCase):
+    """Page boundaries of ``paginate_keyset``, including rows sharing a timestamp."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='pages', password='pages')
+        self.shop = Shop.objects.create(name='Pages', owner=self.owner)
+        start = datetime(2026, 1, 1, 12, tzinfo=dt_timezone.utc)
+        for i in range(7):
+            sale = Sale.objects.create(shop=self.shop, cashier=self.owner, total_amount=i)
+            # Pairs of sales share a created_at: only the id separates them.
+            Sale.objects.filter(pk=sale.pk).update(created_at=start + timedelta(minutes=i // 2))
+        self.sales = Sale.objects.filter(shop=self.shop)
+        self.expected = list(self.sales.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def _walk(self, per_page):
+        pages, cursor = [], None
+        while True:
+            page = paginate_keyset(self.sales, after=cursor, per_page=per_page)
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_pages_cover_every_row_once(self):
+        for per_page in (1, 2, 3, 7, 10):
+            pages = self._walk(per_page)
+            ids = [sale.pk for page in pages for sale in page]
+            self.assertEqual(ids, self.expected, per_page)
+            self.assertFalse(pages[0].has_previous)
+            self.assertTrue(all(len(page) == per_page for page in pages[:-1]))
+
+    def test_previous_cursor_returns_the_previous_page(self):
+        pages = self._walk(2)
+        for before, page in zip(pages, pages[1:]):
+            back = paginate_keyset(self.sales, before=page.previous_cursor, per_page=2)
+            self.assertEqual([s.pk for s in back], [s.pk for s in before])
+            self.assertEqual(back.has_previous, before.has_previous)
+            self.assertEqual(back.next_cursor, before.next_cursor)
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        self.sales.filter(pk=self.expected[-1]).delete()
+        pages = self._walk(3)
+        self.assertEqual([len(page) for page in pages], [3, 3])
+
+    def test_bad_or_exhausted_cursors(self):
+        self.assertEqual([s.pk for s in paginate_keyset(self.sales, after='not-a-cursor', per_page=3)], self.expected[:3])
+        self.assertIsNone(decode_cursor('bm9waXBl'))
+        oldest = self.sales.get(pk=self.expected[-1])
+        page = paginate_keyset(self.sales, after=encode_cursor(oldest.created_at, oldest.pk))
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next or page.has_previous)
+
+
+class RollupTest(TestCase):
+    """Incremental rollups (record on commit, forget on delete) against ``rollups.rebuild``."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='rollup', password='rollup')
+        self.shop = Shop.objects.create(name='Rollup', owner=self.owner)
+        self.cashier = User.objects.create_user(username='rollup-cashier', password='rollup', shop=self.shop)
+        self.tea = Product.objects.create(shop=self.shop, name='Thé', selling_price=100, purchase_price=60, quantity=100)
+        self.rice = Product.objects.create(shop=self.shop, name='Riz', selling_price=250, purchase_price=200, quantity=100)
+
+    def _sell(self, cashier, *items, **fields):
+        return commit_sale(self.shop, cashier, [dict(item) for item in items], **fields)
+
+    def _rollups(self):
+        # Rows brought back to zero by forget_sale are kept; they carry nothing.
+        summaries = {
+            (row.date, row.payment_method, row.cashier_id): (row.sale_count, row.revenue, row.cost)
+            for row in DailySalesSummary.objects.filter(shop=self.shop)
+            if row.sale_count
+        }
+        products = {
+            (row.date, row.product_id, row.product_name): (row.quantity, row.revenue, row.cost)
+            for row in ProductDailySales.objects.filter(shop=self.shop)
+            if row.quantity
+        }
+        return summaries, products
+
+    def _rebuilt(self):
+        incremental = self._rollups()
+        rollups.rebuild(self.shop)
+        return incremental, self._rollups()
+
+    def _sell_day(self):
+        return [
+            self._sell(self.owner, {'product': self.tea, 'quantity': 2}, {'product': self.rice, 'quantity': 1}),
+            self._sell(self.cashier, {'product': self.tea, 'quantity': 1}, {'product_name': 'Sac', 'quantity': 3, 'price': 50}),
+            self._sell(self.cashier, {'product': self.rice, 'quantity': 4}, payment_method=Sale.PaymentMethod.MOBILE_MONEY),
+        ]
+
+    def test_recorded_sales_match_rebuild(self):
+        self._sell_day()
+        incremental, rebuilt = self._rebuilt()
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(sum(count for count, _r, _c in incremental[0].values()), 3)
+
+    def test_forget_undoes_record(self):
+        before = self._rollups()
+        sales = self._sell_day()
+        sales[1].delete()
+        incremental, rebuilt = self._rebuilt()
+        self.assertEqual(incremental, rebuilt)
+
+        for sale in (sales[0], sales[2]):
+            sale.delete()
+        self.assertEqual(self._rollups(), before)
+        self.assertFalse(DailySalesSummary.objects.filter(shop=self.shop).exclude(sale_count=0).exists())
+
+    def test_deleted_cashiers_share_one_row(self):
+        other = User.objects.create_user(username='rollup-other', password='rollup', shop=self.shop)
+        sales = [self._sell(cashier, {'product': self.tea, 'quantity': 1}) for cashier in (self.cashier, other)]
+        self.cashier.delete()
+        other.delete()
+
+        rows = DailySalesSummary.objects.filter(shop=self.shop, cashier__isnull=True)
+        self.assertEqual(list(rows.values_list('sale_count', 'revenue')), [(2, 200)])
+
+        Sale.objects.get(pk=sales[0].pk).delete()
+        self.assertEqual(list(rows.values_list('sale_count', 'revenue')), [(1, 100)])
+        incremental, rebuilt = self._rebuilt()
+        self.assertEqual(incremental, rebuilt)
+
+    def test_deleted_product_folds_into_free_lines(self):
+        self._sell(self.owner, {'product': self.tea, 'quantity': 2})
+        self._sell(self.owner, {'product_name': 'Thé', 'quantity': 1, 'price': 100})
+        self.tea.delete()
+
+        rows = ProductDailySales.objects.filter(shop=self.shop, product__isnull=True, product_name='Thé')
+        self.assertEqual(list(rows.values_list('quantity', 'revenue', 'cost')), [(3, 300, 120)])
+        incremental, rebuilt = self._rebuilt()
+        self.assertEqual(incremental, rebuilt)
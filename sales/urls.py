@@ -9,4 +9,5 @@ urlpatterns = [
     path('actions/', views_web.action_log, name='action_log'),
     path('invoices/<int:invoice_id>/receipt/', views_web.sale_receipt, name='sale_receipt'),
     path('products/search/', views_web.search_products, name='product_search'),
+    path('products/scan/', views_web.scan_product, name='product_scan'),
 ]
@@ -3,6 +3,7 @@ from xhtml2pdf import pisa
 import os
 from django.conf import settings
 from django.utils import timezone
+from .audit import log_action
 from .models import ActionLog
 
 
@@ -28,16 +29,13 @@ def generate_invoice_pdf(invoice):
         if pisa_status.err:
             raise Exception('Error creating PDF')
     # log action
-    try:
-        ActionLog.objects.create(
-            shop=invoice.sale.shop,
-            user=getattr(invoice.sale, 'cashier', None),
-            action=ActionLog.ActionChoices.INVOICE_PDF_GENERATED,
-            object_type='Invoice',
-            object_id=str(invoice.id),
-            description=f'PDF generated: {filename}',
-        )
-    except Exception:
-        pass
+    log_action(
+        invoice.sale.shop_id,
+        ActionLog.ActionChoices.INVOICE_PDF_GENERATED,
+        user=invoice.sale.cashier_id,
+        obj=invoice,
+        description=f'PDF generated: {filename}',
+    )
 
     return f'invoices/{filename}'
+
@@ -1,21 +1,23 @@
 from rest_framework import viewsets
+from core.api import ConditionalGetMixin
 from .models import Sale, Invoice, Payment
-from .serializers import SaleSerializer, InvoiceSerializer, PaymentSerializer
+from .serializers import SaleSerializer, InvoiceSerializer, PaymentSerializer, selected_fields
 
-class SaleViewSet(viewsets.ModelViewSet):
+class SaleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = SaleSerializer
 
     def get_queryset(self):
         user = self.request.user
-        if user.shop:
-            return Sale.objects.filter(shop=user.shop)
-        return Sale.objects.none()
+        if not user.shop:
+            return Sale.objects.none()
+        fields = selected_fields(self.request, SaleSerializer.Meta.fields, SaleSerializer.EXPANDABLE)
+        return SaleSerializer.setup_eager_loading(Sale.objects.filter(shop=user.shop), fields)
 
     def perform_create(self, serializer):
         # Associate shop and cashier
         serializer.save(shop=self.request.user.shop, cashier=self.request.user)
 
-class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+class InvoiceViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = InvoiceSerializer
 
     def get_queryset(self):
@@ -1,11 +1,19 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from django.contrib import messages
 from inventory.models import Product
-from .models import Invoice
+from inventory import search as product_search
+from .models import Invoice, DailySalesSummary
 from .models import ActionLog
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .audit import log_action
+from . import archive
+from .pagination import paginate_keyset
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import urlencode
+from datetime import datetime, time, timedelta
 
 @login_required
 def pos_view(request):
@@ -15,35 +23,69 @@ def pos_view(request):
 @login_required
 def search_products(request):
     query = request.GET.get('q', '')
-    products = Product.objects.filter(shop=request.user.shop, name__icontains=query)[:10]
+    products = product_search.search_products(request.user.shop, query, limit=10)
     return render(request, 'sales/partials/product_results.html', {'products': products})
 
 @login_required
-def invoice_list(request):
-    invoices_qs = Invoice.objects.filter(sale__shop=request.user.shop).select_related('sale').order_by('-created_at')
-
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-
-    if start_date:
-        invoices_qs = invoices_qs.filter(created_at__date__gte=start_date)
-    if end_date:
-        invoices_qs = invoices_qs.filter(created_at__date__lte=end_date)
-
-    # Pagination
-    page = request.GET.get('page', 1)
-    paginator = Paginator(invoices_qs, 20)
+def scan_product(request):
+    """Exact barcode/SKU lookup for scanner input (single indexed query)."""
+    code = request.GET.get('code', '').strip()
+    product = None
+    if code:
+        product = Product.objects.filter(shop=request.user.shop, barcode=code).values(
+            'id', 'name', 'selling_price', 'quantity'
+        ).first()
+    if not product:
+        return JsonResponse({'error': 'Produit introuvable'}, status=404)
+    return JsonResponse({
+        'id': product['id'],
+        'name': product['name'],
+        'price': str(product['selling_price']),
+        'quantity': product['quantity'],
+    })
+
+def _local_day_start(value):
+    """Aware datetime of local midnight for a 'YYYY-MM-DD' string, or None."""
     try:
-        invoices = paginator.page(page)
-    except PageNotAnInteger:
-        invoices = paginator.page(1)
-    except EmptyPage:
-        invoices = paginator.page(paginator.num_pages)
-
-    from django.db.models import Sum
-    total_sales = invoices_qs.aggregate(Sum('sale__total_amount'))['sale__total_amount__sum'] or 0
+        day = parse_date(value) if value else None
+    except ValueError:
+        day = None
+    if day is None:
+        return None, None
+    return day, timezone.make_aware(datetime.combine(day, time.min))
 
-    return render(request, 'sales/invoice_list.html', {'invoices': invoices, 'total_sales': total_sales, 'paginator': paginator})
+@login_required
+def invoice_list(request):
+    shop = request.user.shop
+    invoices_qs = Invoice.objects.filter(sale__shop=shop).select_related('sale__shop__owner')
+    summary_qs = DailySalesSummary.objects.filter(shop=shop)
+
+    # Plain datetime ranges (served by the sale index) instead of created_at__date
+    start_day, start = _local_day_start(request.GET.get('start_date'))
+    end_day, end = _local_day_start(request.GET.get('end_date'))
+    if start:
+        invoices_qs = invoices_qs.filter(sale__created_at__gte=start)
+        summary_qs = summary_qs.filter(date__gte=start_day)
+    if end:
+        invoices_qs = invoices_qs.filter(sale__created_at__lt=end + timedelta(days=1))
+        summary_qs = summary_qs.filter(date__lte=end_day)
+
+    # Keyset pagination on the sale (created_at, id)
+    invoices = paginate_keyset(
+        invoices_qs, after=request.GET.get('after'), before=request.GET.get('before'),
+        per_page=20, keys=('sale__created_at', 'sale_id'),
+    )
+
+    # Period totals from the daily rollups (no scan of the invoices)
+    totals = summary_qs.aggregate(total=Sum('revenue', default=0), count=Sum('sale_count', default=0))
+
+    filters = urlencode({k: request.GET[k] for k in ('start_date', 'end_date') if request.GET.get(k)})
+    return render(request, 'sales/invoice_list.html', {
+        'invoices': invoices,
+        'total_sales': totals['total'],
+        'invoice_count': totals['count'],
+        'filters': filters,
+    })
 
 @login_required
 def sale_detail(request, invoice_id):
@@ -68,17 +110,13 @@ def sale_delete(request, invoice_id):
 
     if request.method == 'POST':
         # Log deletion before removing
-        try:
-            ActionLog.objects.create(
-                shop=sale.shop,
-                user=request.user,
-                action=ActionLog.ActionChoices.SALE_DELETED,
-                object_type='Sale',
-                object_id=str(sale.id),
-                description=f'Sale #{sale.id} deleted by {request.user.username}'
-            )
-        except Exception:
-            pass
+        log_action(
+            sale.shop,
+            ActionLog.ActionChoices.SALE_DELETED,
+            user=request.user,
+            obj=sale,
+            description=f'Sale #{sale.id} deleted by {request.user.username}',
+        )
 
         sale.delete()
         messages.success(request, 'La vente a été supprimée avec succès.')
@@ -90,19 +128,19 @@ def sale_delete(request, invoice_id):
 @login_required
 def action_log(request):
     # Only show logs for the user's shop
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-
-    logs_qs = ActionLog.objects.filter(shop=request.user.shop).select_related('user')
-    page = request.GET.get('page', 1)
-    paginator = Paginator(logs_qs, 50)
-    try:
-        logs = paginator.page(page)
-    except PageNotAnInteger:
-        logs = paginator.page(1)
-    except EmptyPage:
-        logs = paginator.page(paginator.num_pages)
-
-    return render(request, 'sales/action_log.html', {'logs': logs})
+    shop = request.user.shop
+    months = archive.archived_months(shop)
+    month = request.GET.get('archive')
+
+    if month:
+        # Archived month: read-only, paginated in memory
+        from django.core.paginator import Paginator
+        logs = Paginator(archive.read_month(shop, month), 50).get_page(request.GET.get('page'))
+    else:
+        logs_qs = ActionLog.objects.filter(shop=shop).annotate(username=F('user__username'))
+        logs = paginate_keyset(logs_qs, after=request.GET.get('after'), before=request.GET.get('before'), per_page=50)
+
+    return render(request, 'sales/action_log.html', {'logs': logs, 'months': months, 'month': month})
 
 
 @login_required
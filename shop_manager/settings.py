@@ -51,12 +51,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryCountMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ShopMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +90,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent sales queue up instead
+            # of failing with "database is locked" when upgrading a read lock.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -133,6 +141,38 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Action log retention (days kept in the database, per plan); older rows are
+# moved to ACTION_LOG_ARCHIVE_DIR by `manage.py archive_action_logs`.
+ACTION_LOG_RETENTION_DAYS = {
+    'FREE': 90,
+    'MEDIUM': 180,
+    'PRO': 365,
+    'PRO_PLUS': 730,
+}
+ACTION_LOG_ARCHIVE_DIR = BASE_DIR / 'archives' / 'action_logs'
+
+# Query instrumentation (core.middleware.QueryCountMiddleware): per-view
+# query count / DB time headers and stats on /debug/queries/. Budgets are
+# max queries per URL name (prefixed with the method for writes, e.g.
+# 'POST sale-list'); over budget is logged, or raised when strict.
+QUERY_INSTRUMENTATION = False
+QUERY_BUDGET_STRICT = False
+QUERY_BUDGETS = {
+    'dashboard': 8,
+    'pos': 6,
+    'statistics': 10,
+    'invoice_list': 6,
+    'action_log': 6,
+    'accounting_dashboard': 8,
+    'shop_list': 8,
+    'product_list': 6,
+    'sale-list': 8,
+    'POST sale-list': 26,
+    'invoice-list': 6,
+    'product-list': 6,
+    'stockmovement-list': 6,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -150,6 +190,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Cursor pages on (created_at, id); see core.api.
+    'DEFAULT_PAGINATION_CLASS': 'core.api.ApiCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
 LOGIN_REDIRECT_URL = 'dashboard'
@@ -10,10 +10,13 @@
   // Simple IndexedDB wrapper
   function openDB(){
     return new Promise((resolve, reject) => {
-      const req = indexedDB.open('g_business_pwa', 1);
+      const req = indexedDB.open('g_business_pwa', 2);
       req.onupgradeneeded = () => {
         const db = req.result;
         if (!db.objectStoreNames.contains('sync-queue')) db.createObjectStore('sync-queue', { keyPath: 'id', autoIncrement: true });
+        // Local copy of the POS catalog (see /api/products/catalog/)
+        if (!db.objectStoreNames.contains('catalog')) db.createObjectStore('catalog', { keyPath: 'id' });
+        if (!db.objectStoreNames.contains('meta')) db.createObjectStore('meta');
       };
       req.onsuccess = () => resolve(req.result);
       req.onerror = () => reject(req.error);
@@ -42,17 +45,74 @@
     });
   }
 
-  async function clearQueue(){
+  async function removeFromQueue(keys){
     const db = await openDB();
     return new Promise((res, rej) => {
       const tx = db.transaction('sync-queue', 'readwrite');
       const store = tx.objectStore('sync-queue');
-      store.clear();
+      keys.forEach(k => store.delete(k));
       tx.oncomplete = () => res(true);
       tx.onerror = () => rej(tx.error);
     });
   }
 
+  function newOpId(){
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+  }
+
+  async function getMeta(key){
+    const db = await openDB();
+    return new Promise((res, rej) => {
+      const req = db.transaction('meta', 'readonly').objectStore('meta').get(key);
+      req.onsuccess = () => res(req.result);
+      req.onerror = () => rej(req.error);
+    });
+  }
+
+  // Fetch the catalog (full or delta since the stored version) into IndexedDB
+  async function refreshCatalog(){
+    if (!navigator.onLine) return false;
+    try{
+      const version = (await getMeta('catalog_version')) || 0;
+      const res = await fetch('/api/products/catalog/?since=' + version, { credentials: 'include' });
+      if (res.status === 304) return true;
+      if (!res.ok) return false;
+      const data = await res.json();
+      const cols = data.columns;
+      const db = await openDB();
+      return new Promise((resolve, reject) => {
+        const tx = db.transaction(['catalog', 'meta'], 'readwrite');
+        const store = tx.objectStore('catalog');
+        if (data.full) store.clear();
+        (data.deleted || []).forEach(id => store.delete(id));
+        for (let i = 0; i < cols.id.length; i++){
+          store.put({ id: cols.id[i], name: cols.name[i], price: cols.price[i], stock: cols.stock[i], barcode: cols.barcode[i] });
+        }
+        tx.objectStore('meta').put(data.version, 'catalog_version');
+        tx.oncomplete = () => resolve(true);
+        tx.onerror = () => reject(tx.error);
+      });
+    } catch(e){
+      console.warn('PWA: catalog refresh failed', e);
+      return false;
+    }
+  }
+
+  // Search the local catalog (offline POS): barcode exact match or name contains
+  async function searchCatalog(query, limit){
+    const q = (query || '').trim().toLowerCase();
+    const db = await openDB();
+    const all = await new Promise((res, rej) => {
+      const req = db.transaction('catalog', 'readonly').objectStore('catalog').getAll();
+      req.onsuccess = () => res(req.result);
+      req.onerror = () => rej(req.error);
+    });
+    const fold = t => t.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+    const folded = fold(q);
+    return all.filter(p => !q || p.barcode === query.trim() || fold(p.name).includes(folded)).slice(0, limit || 10);
+  }
+
   function getCSRF(){
     const m = document.cookie.match('(^|;)\\s*' + 'csrftoken' + '\\s*=\\s*([^;]+)');
     return m ? m.pop() : '';
@@ -78,7 +138,13 @@
         body: JSON.stringify({ operations: ops })
       });
       if (res.ok){
-        await clearQueue();
+        // Drop every operation the server acknowledged (created, duplicate or
+        // rejected); anything queued meanwhile stays for the next sync.
+        const data = await res.json();
+        const acked = new Set((data.acks || []).map(a => a.op_id).filter(Boolean));
+        const done = queue.filter(q => !q.payload.op_id || acked.has(q.payload.op_id)).map(q => q.id);
+        await removeFromQueue(done);
+        refreshCatalog();
         console.log('PWA: Synced queue');
         // notify service worker to update caches if needed
         if (navigator.serviceWorker && navigator.serviceWorker.controller){
@@ -102,14 +168,18 @@
   // Public API: queue a sale (example)
   window.PWA = {
     queueSale: async function(sale){
-      await addToQueue({ type: 'op', payload: { type: 'sale', payload: sale, queued_at: Date.now() } });
+      await addToQueue({ type: 'op', payload: { type: 'sale', op_id: newOpId(), payload: sale, queued_at: Date.now() } });
       trySync();
-    }
+    },
+    refreshCatalog: refreshCatalog,
+    searchCatalog: searchCatalog
   };
 
   window.addEventListener('online', trySync);
+  window.addEventListener('online', refreshCatalog);
   // Try immediately on load
   trySync();
+  refreshCatalog();
   // Toast helper
   function ensureToastContainer(){
     let c = document.getElementById('pwa-toast-container');